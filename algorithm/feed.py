@@ -0,0 +1,203 @@
+import asyncio
+from datetime import datetime
+from bson import ObjectId
+from pymongo import UpdateOne, ReturnDocument
+from handlers.config import user_collection, posts_collection, feeds_collection
+from handlers.read_history import read_history
+from algorithm.recommendation import calculate_post_score, format_recommended_post, fetch_ranked_posts
+
+FEED_SIZE = 200  # Maximum number of ranked posts kept per user
+FEED_TTL_SECONDS = 3 * 24 * 60 * 60  # Feeds of users that stopped reading them expire after 3 days
+TRENDING_LIKES = 50  # Posts above these thresholds are pushed to every active feed
+TRENDING_VIEWS = 100
+
+
+def build_feed_entry(post, score):
+    """Builds the stored feed entry (recommended post plus its score) of a post."""
+    entry = format_recommended_post(post)
+    entry["score"] = score
+    return entry
+
+
+async def build_feed(user_id: str):
+    """
+    Builds (or rebuilds) the materialized feed of a user from scratch.
+
+    Args:
+        user_id (str): ID of the user to build the feed for.
+
+    Returns:
+        bool: True if the feed was built, False if the user does not exist.
+    """
+    user = await user_collection.find_one({"_id": ObjectId(user_id)})
+    if not user:
+        return False
+
+    user_interests = user.get("interests", [])
+    user_following = user.get("following", {}).get("users", [])
+    now = datetime.utcnow()
+
+    ranked_posts = await fetch_ranked_posts(user_id, user_interests, user_following, now, FEED_SIZE)
+
+    await feeds_collection.update_one(
+        {"user_id": user_id},
+        {
+            "$set": {
+                "interests": user_interests,
+                "following": user_following,
+                "posts": [build_feed_entry(post, score) for score, post in ranked_posts],
+                "updated_on": now,
+            },
+            "$setOnInsert": {"last_read_on": now},
+        },
+        upsert=True
+    )
+    return True
+
+
+async def read_feed(user_id: str, max_posts: int):
+    """
+    Reads a pre-ranked slice of a user's materialized feed, without the posts read since it was built.
+
+    Args:
+        user_id (str): ID of the user to read the feed for.
+        max_posts (int): Number of posts to return.
+
+    Returns:
+        list: The recommended posts, or None if the user has no materialized feed yet.
+    """
+    feed = await feeds_collection.find_one_and_update(
+        {"user_id": user_id},
+        {"$set": {"last_read_on": datetime.utcnow()}},  # Keeps the feed alive while it is being read
+        projection={"posts": {"$slice": max_posts}},
+        return_document=ReturnDocument.AFTER
+    )
+    if not feed:
+        return None
+
+    # Read posts are filtered out before trimming, the following slices of the feed fill in for them
+    posts = []
+    entries = feed.get("posts", [])
+    offset = 0
+    while entries:
+        read_post_ids = await read_history.read_post_ids(user_id, [entry["post_id"] for entry in entries])
+        for entry in entries:
+            if entry["post_id"] in read_post_ids:
+                continue
+            entry.pop("score", None)
+            posts.append(entry)
+        if len(posts) >= max_posts or len(entries) < max_posts:
+            break  # Enough posts, or the end of the feed
+        offset += len(entries)
+        feed = await feeds_collection.find_one({"user_id": user_id}, {"posts": {"$slice": [offset, max_posts]}})
+        entries = feed.get("posts", []) if feed else []
+    return posts[:max_posts]
+
+
+async def update_feeds_for_post(post_id: str):
+    """
+    Incrementally re-scores a created or updated post into every active feed it belongs to.
+
+    Args:
+        post_id (str): ID of the post that changed.
+    """
+    # Drop the stale entry from every feed that already ranks the post
+    ranked_in = await feeds_collection.distinct("user_id", {"posts.post_id": post_id})
+    await feeds_collection.update_many(
+        {"posts.post_id": post_id},
+        {"$pull": {"posts": {"post_id": post_id}}}
+    )
+
+    post = await posts_collection.find_one({"post_id": post_id})
+    if not post:
+        return  # Deleted posts only need to be removed
+
+    is_trending = post["likes"]["count"] >= TRENDING_LIKES or post.get("views", 0) >= TRENDING_VIEWS
+    if is_trending:
+        query = {}
+    else:
+        query = {"$or": [
+            {"interests": {"$in": post["tags"]}},
+            {"following": post.get("user_id")},
+            {"user_id": {"$in": ranked_in}},
+        ]}
+
+    now = datetime.utcnow()
+    updates = []
+    async for feed in feeds_collection.find(query, {"user_id": 1, "interests": 1}):
+        entry = build_feed_entry(post, calculate_post_score(post, feed.get("interests", []), now))
+        updates.append(UpdateOne(
+            {"user_id": feed["user_id"]},
+            {"$push": {"posts": {"$each": [entry], "$sort": {"score": -1}, "$slice": FEED_SIZE}}}
+        ))
+
+    if updates:
+        await feeds_collection.bulk_write(updates, ordered=False)
+
+
+class FeedMaterializer:
+    """
+    Background worker that keeps the materialized feeds up to date.
+
+    Events are de-duplicated while they wait in the queue, so a burst of likes on
+    the same post only re-scores that post once.
+    """
+
+    def __init__(self):
+        self.queue = None
+        self.pending = set()
+        self.task = None
+
+    def start(self):
+        """Starts the worker on the running event loop."""
+        self.queue = asyncio.Queue()
+        self.task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stops the worker, dropping any events that were not processed yet."""
+        if self.task:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+
+    def notify_post(self, post_id: str):
+        """Schedules a post to be re-scored into the feeds (post created, edited, liked or deleted)."""
+        self._enqueue(("post", post_id))
+
+    def notify_user(self, user_id: str):
+        """Schedules an active user's feed to be rebuilt (follows or interests changed)."""
+        self._enqueue(("user", user_id))
+
+    def schedule_build(self, user_id: str):
+        """Schedules the feed of a cold user (no materialized feed yet) to be built."""
+        self._enqueue(("build", user_id))
+
+    def _enqueue(self, event):
+        if self.queue is None or event in self.pending:
+            return
+        self.pending.add(event)
+        self.queue.put_nowait(event)
+
+    async def _run(self):
+        while True:
+            event = await self.queue.get()
+            self.pending.discard(event)
+            kind, key = event
+            try:
+                if kind == "post":
+                    await update_feeds_for_post(key)
+                elif kind == "build":
+                    await build_feed(key)
+                elif await feeds_collection.find_one({"user_id": key}, {"_id": 1}):
+                    # Only active users have a feed worth rebuilding
+                    await build_feed(key)
+            except Exception as e:
+                print(f"Error updating feeds for {kind} {key}: {e}")
+            finally:
+                self.queue.task_done()
+
+
+feed_materializer = FeedMaterializer()
@@ -1,8 +1,320 @@
+import asyncio
+import heapq
 import random
+import time
 from datetime import datetime
 from pymongo import DESCENDING
 from bson import ObjectId
-from handlers.config import user_collection, posts_collection, communities_collection
+from handlers.config import user_collection, posts_collection, communities_collection, read_history_collection, RANKING_ENGINE, RECOMMENDATION_RETRIEVAL, RECOMMENDATION_SOURCE_TIMEOUT
+from handlers.read_history import read_history
+from algorithm.vector_ranking import np, rank_posts_vectorized
+
+if RANKING_ENGINE == "numpy" and np is None:
+    print("NumPy is not installed, falling back to the python ranking engine")
+
+# Per-source latency metrics of the candidate retrieval stage
+source_metrics = {}
+
+
+async def fetch_source(name: str, coroutine, default=None):
+    """
+    Awaits a candidate source with a timeout, degrading to a default result if it is slow or fails.
+
+    Args:
+        name (str): Name of the source, used for the latency metrics.
+        coroutine: The query to await.
+        default: The result used when the source times out or fails.
+
+    Returns:
+        The result of the source, or the default.
+    """
+    metrics = source_metrics.setdefault(name, {"calls": 0, "timeouts": 0, "errors": 0, "total_ms": 0.0, "max_ms": 0.0})
+    metrics["calls"] += 1
+    start = time.perf_counter()
+    try:
+        return await asyncio.wait_for(coroutine, RECOMMENDATION_SOURCE_TIMEOUT)
+    except asyncio.TimeoutError:
+        metrics["timeouts"] += 1
+        print(f"Recommendation source '{name}' timed out, continuing without it")
+        return default
+    except Exception as e:
+        metrics["errors"] += 1
+        print(f"Recommendation source '{name}' failed, continuing without it: {e}")
+        return default
+    finally:
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        metrics["total_ms"] += elapsed_ms
+        metrics["max_ms"] = max(metrics["max_ms"], elapsed_ms)
+
+
+def get_source_metrics():
+    """Returns the latency metrics of every candidate source."""
+    return {
+        name: {
+            "calls": metrics["calls"],
+            "timeouts": metrics["timeouts"],
+            "errors": metrics["errors"],
+            "avg_ms": round(metrics["total_ms"] / metrics["calls"], 2) if metrics["calls"] else 0.0,
+            "max_ms": round(metrics["max_ms"], 2),
+        }
+        for name, metrics in source_metrics.items()
+    }
+
+
+def calculate_post_score(post, user_interests, now):
+    """
+    Scores a post for a user based on interest overlap, engagement, freshness and views.
+
+    Args:
+        post (dict): The post document to score.
+        user_interests (list): The interests (tags) of the user the post is scored for.
+        now (datetime): The reference time used for the freshness boost.
+
+    Returns:
+        int: The score of the post.
+    """
+    score = 0
+    # Boost for tags that match user interests
+    for tag in post["tags"]:
+        if tag in user_interests:
+            score += 10
+    # Likes, dislikes, and comments impact
+    score += post["likes"]["count"] * 5
+    score -= post["dislikes"]["count"] * 2
+    score += post["comment_count"] * 3
+    # Freshness boost for posts created within the last 7 days
+    days_since_posted = (now - post["created_on"]).days
+    if days_since_posted <= 7:
+        score += (7 - days_since_posted) * 2
+    # Incorporate views, with diminishing returns for higher view counts
+    if "views" in post:
+        score += min(post["views"] // 10, 20)  # Add up to 20 points max for views, scaled by every 10 views
+    return score
+
+
+def format_recommended_post(post):
+    """Converts a post document into the shape returned by the recommendation endpoints."""
+    return {
+        "post_id": post["post_id"],
+        "heading": post["heading"],
+        "tldr": post["tldr"],
+        "description": post.get("description", None),
+        "tags": post["tags"],
+        "likes": post["likes"]["count"],
+        "dislikes": post["dislikes"]["count"],
+        "comments_count": post["comment_count"],
+        "views": post.get("views", 0),
+        "created_on": post["created_on"].isoformat(),
+    }
+
+
+def candidate_sources(user_interests: list, user_following: list):
+    """
+    Describes the candidate sources of a user: interest based, followed users and trending posts.
+
+    Args:
+        user_interests (list): The interests (tags) of the user.
+        user_following (list): The users followed by the user.
+
+    Returns:
+        list: (name, filter, sort, limit) tuples, one per source.
+    """
+    return [
+        ("interests", {"tags": {"$in": user_interests}}, None, 100),
+        ("following", {"user_id": {"$in": user_following}}, None, 50),
+        ("trending", {
+            "$or": [
+                {"likes.count": {"$gte": 50}},
+                {"dislikes.count": {"$lte": 10}},
+                {"views": {"$gte": 100}}  # Trending posts with high views
+            ]
+        }, ("likes.count", DESCENDING), 50),
+    ]
+
+
+async def fetch_candidate_posts(user_interests: list, user_following: list):
+    """
+    Fetches the candidate posts for a user from the interest, followed users and trending sources.
+
+    Args:
+        user_interests (list): The interests (tags) of the user.
+        user_following (list): The users followed by the user.
+
+    Returns:
+        list: The candidate posts, without duplicates.
+    """
+    queries = []
+    for name, query, sort, limit in candidate_sources(user_interests, user_following):
+        cursor = posts_collection.find(query)
+        if sort:
+            cursor = cursor.sort(*sort)
+        queries.append(fetch_source(name, cursor.to_list(length=limit), default=[]))
+
+    # Query every source concurrently, a slow source only drops its own candidates
+    all_posts = {}
+    for source_posts in await asyncio.gather(*queries):
+        # Merge posts and remove duplicates (based on post ID)
+        for post in source_posts:
+            all_posts.setdefault(post["_id"], post)
+    return list(all_posts.values())
+
+
+def build_score_expression(user_interests: list, now):
+    """Builds the aggregation expression computing calculate_post_score on the server."""
+    days_since_posted = {"$floor": {"$divide": [{"$subtract": [now, "$created_on"]}, 24 * 60 * 60 * 1000]}}
+    return {"$add": [
+        {"$multiply": [{"$size": {"$filter": {
+            "input": {"$ifNull": ["$tags", []]},
+            "cond": {"$in": ["$$this", user_interests]}
+        }}}, 10]},
+        {"$multiply": ["$likes.count", 5]},
+        {"$multiply": ["$dislikes.count", -2]},
+        {"$multiply": ["$comment_count", 3]},
+        {"$let": {
+            "vars": {"days": days_since_posted},
+            "in": {"$cond": [{"$lte": ["$$days", 7]}, {"$multiply": [{"$subtract": [7, "$$days"]}, 2]}, 0]}
+        }},
+        {"$cond": [
+            {"$eq": [{"$type": "$views"}, "missing"]},
+            0,
+            {"$min": [{"$floor": {"$divide": ["$views", 10]}}, 20]}
+        ]},
+    ]}
+
+
+async def aggregate_ranked_posts(user_id: str, user_interests: list, user_following: list, now, limit: int):
+    """
+    Retrieves, scores and ranks the candidate posts in a single aggregation on the server.
+
+    Only the fields needed for scoring and for the response are projected, and the posts
+    the user has read are removed with an indexed lookup into the read history.
+
+    Args:
+        user_id (str): ID of the user.
+        user_interests (list): The interests (tags) of the user.
+        user_following (list): The users followed by the user.
+        now (datetime): The reference time used for the freshness boost.
+        limit (int): Number of top posts to return.
+
+    Returns:
+        list: (score, post) tuples of the top posts, best first.
+    """
+    if limit <= 0:
+        return []
+
+    source_pipelines = []
+    for _, query, sort, source_limit in candidate_sources(user_interests, user_following):
+        pipeline = [{"$match": query}]
+        if sort:
+            pipeline.append({"$sort": {sort[0]: sort[1]}})
+        pipeline.append({"$limit": source_limit})
+        source_pipelines.append(pipeline)
+
+    pipeline = source_pipelines[0]
+    for source_pipeline in source_pipelines[1:]:
+        pipeline.append({"$unionWith": {"coll": posts_collection.name, "pipeline": source_pipeline}})
+    pipeline += [
+        {"$project": {
+            "post_id": 1,
+            "heading": 1,
+            "tldr": 1,
+            "description": 1,
+            "tags": 1,
+            "likes.count": 1,
+            "dislikes.count": 1,
+            "comment_count": 1,
+            "views": 1,
+            "created_on": 1,
+        }},
+        # Remove duplicates (based on post ID) and recently read posts
+        {"$group": {"_id": "$_id", "post": {"$first": "$$ROOT"}}},
+        {"$replaceRoot": {"newRoot": "$post"}},
+        {"$lookup": {
+            "from": read_history_collection.name,
+            "let": {"post_id": "$post_id"},
+            "pipeline": [
+                {"$match": {"user_id": user_id, "$expr": {"$eq": ["$post_id", "$$post_id"]}}},
+                {"$limit": 1},
+                {"$project": {"_id": 1}},
+            ],
+            "as": "read",
+        }},
+        {"$match": {"read": []}},
+        {"$unset": "read"},
+        # The random tiebreak shuffles posts that share the same score
+        {"$set": {"score": build_score_expression(user_interests, now), "tiebreak": {"$rand": {}}}},
+        {"$sort": {"score": -1, "tiebreak": -1}},
+        {"$limit": limit},
+    ]
+
+    posts = await fetch_source("aggregate", posts_collection.aggregate(pipeline).to_list(length=limit), default=[])
+    return [(int(post["score"]), post) for post in posts]
+
+
+async def fetch_ranked_posts(user_id: str, user_interests: list, user_following: list, now, limit: int):
+    """
+    Fetches and ranks the recommended posts of a user with the configured retrieval mode.
+
+    Posts the user has already read are not recommended.
+
+    Args:
+        user_id (str): ID of the user.
+        user_interests (list): The interests (tags) of the user.
+        user_following (list): The users followed by the user.
+        now (datetime): The reference time used for the freshness boost.
+        limit (int): Number of top posts to return.
+
+    Returns:
+        list: (score, post) tuples of the top posts, best first.
+    """
+    if RECOMMENDATION_RETRIEVAL == "aggregate":
+        return await aggregate_ranked_posts(user_id, user_interests, user_following, now, limit)
+
+    all_posts = await fetch_candidate_posts(user_interests, user_following)
+    read_post_ids = await read_history.read_post_ids(user_id, [post["post_id"] for post in all_posts])
+    all_posts = [post for post in all_posts if post["post_id"] not in read_post_ids]
+    return rank_posts(all_posts, user_interests, now, limit=limit)
+
+
+def score_posts(posts: list, user_interests: list, now):
+    """
+    Scores every candidate post exactly once.
+
+    Args:
+        posts (list): The posts to score.
+        user_interests (list): The interests (tags) of the user the posts are scored for.
+        now (datetime): The reference time used for the freshness boost.
+
+    Returns:
+        list: (score, tiebreak, post) tuples. The random tiebreak shuffles posts that share the same score.
+    """
+    return [(calculate_post_score(post, user_interests, now), random.random(), post) for post in posts]
+
+
+def rank_posts(posts: list, user_interests: list, now, limit: int = None):
+    """
+    Ranks posts by score, shuffling posts that share the same score.
+
+    Args:
+        posts (list): The posts to rank.
+        user_interests (list): The interests (tags) of the user the posts are ranked for.
+        now (datetime): The reference time used for the freshness boost.
+        limit (int): Number of top posts to keep. If None, all posts are ranked.
+
+    Returns:
+        list: (score, post) tuples of the top posts, best first.
+    """
+    if RANKING_ENGINE == "numpy" and np is not None:
+        return rank_posts_vectorized(posts, user_interests, now, limit)
+
+    scored_posts = score_posts(posts, user_interests, now)
+    if limit is None:
+        limit = len(scored_posts)
+
+    # Heap-based top-K selection instead of sorting the whole candidate pool
+    top_posts = heapq.nlargest(limit, scored_posts, key=lambda scored_post: scored_post[:2])
+    return [(score, post) for score, _, post in top_posts]
+
 
 async def recommend_content(
     user_id: str,
@@ -30,88 +342,23 @@ async def recommend_content(
     user_interests = user.get("interests", [])
     user_following = user.get("following", {}).get("users", [])
     user_bio = user.get("bio", "").lower()  # Normalize bio for matching
-    recently_read_posts = user.get("recently_read_posts", [])
     now = datetime.utcnow()
 
     recommendations = {}
 
-    # Helper to calculate post scores
-    def calculate_post_score(post):
-        score = 0
-        # Boost for tags that match user interests
-        for tag in post["tags"]:
-            if tag in user_interests:
-                score += 10
-        # Likes, dislikes, and comments impact
-        score += post["likes"]["count"] * 5
-        score -= post["dislikes"]["count"] * 2
-        score += len(post["comments"]) * 3
-        # Freshness boost for posts created within the last 7 days
-        days_since_posted = (now - post["created_on"]).days
-        if days_since_posted <= 7:
-            score += (7 - days_since_posted) * 2
-        # Incorporate views, with diminishing returns for higher view counts
-        if "views" in post:
-            score += min(post["views"] // 10, 20)  # Add up to 20 points max for views, scaled by every 10 views
-        return score
-
     # Fetch and process posts if max_posts is specified
-    if max_posts is not None:
-        interest_based_posts = await posts_collection.find({
-            "tags": {"$in": user_interests}
-        }).to_list(length=100)
-
-        followed_users_posts = await posts_collection.find({
-            "user_id": {"$in": user_following}
-        }).to_list(length=50)
-
-        trending_posts = await posts_collection.find({
-            "$or": [
-                {"likes.count": {"$gte": 50}},
-                {"dislikes.count": {"$lte": 10}},
-                {"views": {"$gte": 100}}  # Trending posts with high views
-            ]
-        }).sort("likes.count", DESCENDING).to_list(length=50)
-
-        # Merge posts and remove duplicates (based on post ID)
-        all_posts = {post["_id"]: post for post in (interest_based_posts + followed_users_posts + trending_posts)}
-        all_posts = [post for post in all_posts.values() if post["_id"] not in recently_read_posts]
-
-        # Rank posts based on the updated scoring system
-        ranked_posts = sorted(all_posts, key=calculate_post_score, reverse=True)
-
-        # Group posts by score and shuffle within each group
-        grouped_posts = {}
-        for post in ranked_posts:
-            score = calculate_post_score(post)
-            grouped_posts.setdefault(score, []).append(post)
-
-        final_posts = []
-        for score, posts in grouped_posts.items():
-            random.shuffle(posts)
-            final_posts.extend(posts)
+    async def recommend_posts():
+        final_posts = await fetch_ranked_posts(user_id, user_interests, user_following, now, max_posts)
 
         recommendations["recommended_posts"] = [
-            {
-                "post_id": post["post_id"],
-                "heading": post["heading"],
-                "tldr": post["tldr"],
-                "description": post.get("description", None),
-                "tags": post["tags"],
-                "likes": post["likes"]["count"],
-                "dislikes": post["dislikes"]["count"],
-                "comments_count": len(post["comments"]),
-                "views": post.get("views", 0),
-                "created_on": post["created_on"].isoformat(),
-            }
-            for post in final_posts[:max_posts]
+            format_recommended_post(post) for _, post in final_posts
         ]
 
     # Fetch and process communities if max_communities is specified
-    if max_communities is not None:
-        recommended_communities = await communities_collection.find({
+    async def recommend_communities():
+        recommended_communities = await fetch_source("communities", communities_collection.find({
             "tags": {"$in": user_interests}
-        }).sort([("member_count", DESCENDING), ("created_on", DESCENDING)]).to_list(length=100)
+        }).sort([("member_count", DESCENDING), ("created_on", DESCENDING)]).to_list(length=100), default=[])
 
         community_set = set()
         ranked_communities = []
@@ -131,7 +378,7 @@ async def recommend_content(
         ]
 
     # Fetch and process users if max_users is specified
-    if max_users is not None:
+    async def recommend_users():
         def calculate_user_similarity_score(target_user):
             score = 0
             if target_user["_id"] in user_following:
@@ -144,17 +391,16 @@ async def recommend_content(
                     score += 5
             return score
 
-        potential_users = await user_collection.find({
+        potential_users = await fetch_source("users", user_collection.find({
             "_id": {"$ne": ObjectId(user_id)},
             "$or": [
                 {"interests": {"$in": user_interests}},
                 {"bio": {"$regex": "|".join(user_interests), "$options": "i"}}
             ]
-        }).to_list(length=100)
+        }).to_list(length=100), default=[])
 
-        scored_users = [(target_user, calculate_user_similarity_score(target_user)) for target_user in potential_users]
-        scored_users = [user for user, score in scored_users if score > 0]
-        scored_users.sort(key=lambda user: calculate_user_similarity_score(user), reverse=True)
+        # Score each candidate once and keep the similar ones (their order is shuffled anyway)
+        scored_users = [target_user for target_user in potential_users if calculate_user_similarity_score(target_user) > 0]
         random.shuffle(scored_users)
 
         recommendations["recommended_users"] = [
@@ -166,4 +412,14 @@ async def recommend_content(
             for user in scored_users[:max_users]
         ]
 
+    # Run the requested sections concurrently
+    sections = []
+    if max_posts is not None:
+        sections.append(recommend_posts())
+    if max_communities is not None:
+        sections.append(recommend_communities())
+    if max_users is not None:
+        sections.append(recommend_users())
+    await asyncio.gather(*sections)
+
     return recommendations
\ No newline at end of file
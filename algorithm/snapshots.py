@@ -0,0 +1,111 @@
+import base64
+from datetime import datetime
+from uuid import uuid4
+from handlers.config import recommendation_snapshots_collection
+
+SNAPSHOT_TTL_SECONDS = 15 * 60  # Snapshots (and their cursors) expire after 15 minutes
+
+
+def encode_cursor(snapshot_id: str, offset: int) -> str:
+    """Encodes a snapshot ID and an offset into an opaque continuation cursor."""
+    return base64.urlsafe_b64encode(f"{snapshot_id}:{offset}".encode()).decode()
+
+
+def decode_cursor(cursor: str):
+    """
+    Decodes a continuation cursor.
+
+    Args:
+        cursor (str): The cursor returned by a previous page.
+
+    Returns:
+        tuple: The snapshot ID and the offset of the next page.
+
+    Raises:
+        ValueError: If the cursor is malformed.
+    """
+    try:
+        snapshot_id, offset = base64.urlsafe_b64decode(cursor.encode()).decode().split(":")
+        offset = int(offset)
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if offset < 0:
+        raise ValueError("Invalid cursor")
+    return snapshot_id, offset
+
+
+async def create_snapshot(user_id: str, ranked_posts: list) -> str:
+    """
+    Stores a ranked list of recommended posts so the following pages can be served from it.
+
+    Every user has a single snapshot, replaced by each first page: the snapshot ID is
+    rotated, so the cursors of the previous snapshot stop working.
+
+    Args:
+        user_id (str): ID of the user the posts were ranked for.
+        ranked_posts (list): The ranked recommended posts.
+
+    Returns:
+        str: The ID of the snapshot.
+    """
+    snapshot_id = str(uuid4())
+    await recommendation_snapshots_collection.update_one(
+        {"user_id": user_id},
+        {"$set": {
+            "snapshot_id": snapshot_id,
+            "size": len(ranked_posts),
+            "posts": ranked_posts,
+            "created_on": datetime.utcnow()
+        }},
+        upsert=True
+    )
+    return snapshot_id
+
+
+async def first_page(user_id: str, ranked_posts: list, page_size: int):
+    """
+    Returns the first page of a ranked list, snapshotting the rest for later pages.
+
+    Args:
+        user_id (str): ID of the user the posts were ranked for.
+        ranked_posts (list): The ranked recommended posts.
+        page_size (int): Number of posts per page.
+
+    Returns:
+        tuple: The posts of the page and the cursor of the next page (None on the last page).
+    """
+    if len(ranked_posts) <= page_size:
+        return ranked_posts, None
+
+    snapshot_id = await create_snapshot(user_id, ranked_posts)
+    return ranked_posts[:page_size], encode_cursor(snapshot_id, page_size)
+
+
+async def next_page(user_id: str, cursor: str, page_size: int):
+    """
+    Reads the page of a snapshot pointed to by a continuation cursor.
+
+    Args:
+        user_id (str): ID of the user requesting the page.
+        cursor (str): The cursor returned by the previous page.
+        page_size (int): Number of posts per page.
+
+    Returns:
+        tuple: The posts of the page and the cursor of the next page (None on the last page),
+        or None if the snapshot expired.
+
+    Raises:
+        ValueError: If the cursor is malformed.
+    """
+    snapshot_id, offset = decode_cursor(cursor)
+    snapshot = await recommendation_snapshots_collection.find_one(
+        {"snapshot_id": snapshot_id, "user_id": user_id},
+        {"size": 1, "posts": {"$slice": [offset, page_size]}}
+    )
+    if not snapshot:
+        return None
+
+    posts = snapshot["posts"]
+    next_offset = offset + len(posts)
+    next_cursor = encode_cursor(snapshot_id, next_offset) if posts and next_offset < snapshot["size"] else None
+    return posts, next_cursor
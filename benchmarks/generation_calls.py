@@ -0,0 +1,108 @@
+"""
+Benchmarks the number of model calls per successful tags and TLDR generation.
+
+Usage:
+    python -m benchmarks.generation_calls [--posts 1000] [--seed 1]
+
+The model is simulated with the kinds of output seen from the local models: valid
+JSON, JSON wrapped in prose or a code fence, JSON missing a field, tags as a string
+instead of a list, and no JSON at all. The previous path (`json.loads` on the raw
+output, and the fetchers calling the model again until both fields were set, up to
+6 times) is compared with `generate_structured` (JSON mode, tolerant extraction and
+targeted repair prompts) on the same output distribution. Repair prompts only succeed
+when they repeat the heading and description of the post, as the model keeps no state
+between calls.
+"""
+import argparse
+import asyncio
+import json
+import random
+import generators.gen_post_info as gen_post_info
+
+PREVIOUS_MAX_RETRIES = 6  # Model calls the fetchers made per post before giving up
+# Simulated outputs of a first generation, with their relative frequency
+OUTPUTS = [
+    ('{"tags": ["python", "asyncio", "web", "api", "backend", "tutorial"], "tldr": "A short summary."}', 50),
+    ('Sure! Here is the JSON:\n```json\n{"tags": ["python", "asyncio", "web", "api", "backend", "tutorial"], "tldr": "A short summary."}\n```', 20),
+    ('{"tldr": "A short summary."}', 15),
+    ('{"tags": "python, asyncio, web", "tldr": "A short summary."}', 10),
+    ("I cannot summarize this post.", 5),
+]
+REPAIR_SUCCESS_RATE = 0.9  # Share of repair prompts (repeating the post) answered with the requested fields
+
+
+class SimulatedModel:
+    """Stands in for the LLM client, answering prompts from the simulated output distribution."""
+
+    model = "simulated"
+
+    def __init__(self, rng):
+        self.rng = rng
+        self.calls = 0
+        self.post = None  # The (heading, description) of the post being generated
+
+    def sample(self):
+        outputs, weights = zip(*OUTPUTS)
+        return self.rng.choices(outputs, weights)[0]
+
+    async def generate(self, prompt, **kwargs):
+        self.calls += 1
+        if "Your previous output" not in prompt:
+            return self.sample()
+        # Without the post, the model cannot produce tags or a TLDR of it
+        if not all(text in prompt for text in self.post) or self.rng.random() >= REPAIR_SUCCESS_RATE:
+            return "I cannot do that."
+        # A repair answers the requested fields only
+        requested = prompt.split("with the field(s)", 1)[1].split("where", 1)[0]
+        answer = {}
+        if '"tags"' in requested:
+            answer["tags"] = ["python", "asyncio", "web", "api", "backend", "tutorial"]
+        if '"tldr"' in requested:
+            answer["tldr"] = "A short summary."
+        return json.dumps(answer)
+
+
+def previous_generation(model):
+    """The previous path: parse the raw output, and call again until both fields were set."""
+    tldr, tags = "", []
+    for _ in range(PREVIOUS_MAX_RETRIES):
+        try:
+            data = json.loads(model.sample())
+        except json.JSONDecodeError:
+            data = {}
+        model.calls += 1
+        tldr = tldr or data.get("tldr", "")
+        tags = tags or data.get("tags", [])
+        if tldr and tags:
+            return True
+    return False
+
+
+async def structured_generations(model, posts):
+    """Runs `generate_post_info` on the simulated model and returns the number of successes."""
+    gen_post_info.llm_client = model
+    successes = 0
+    for number in range(posts):
+        model.post = (f"Post {number} heading", f"The description of post {number}.")
+        result = await gen_post_info.generate_post_info(*model.post)
+        successes += "error" not in result
+    return successes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the model calls per successful generation.")
+    parser.add_argument("--posts", type=int, default=1000, help="number of simulated posts")
+    parser.add_argument("--seed", type=int, default=1, help="seed of the simulated outputs")
+    args = parser.parse_args()
+
+    previous = SimulatedModel(random.Random(args.seed))
+    successes = sum(previous_generation(previous) for _ in range(args.posts))
+    print(f"previous:   {successes}/{args.posts} succeeded, {previous.calls / successes:.2f} calls per success")
+
+    structured = SimulatedModel(random.Random(args.seed))
+    successes = asyncio.run(structured_generations(structured, args.posts))
+    print(f"structured: {successes}/{args.posts} succeeded, {structured.calls / successes:.2f} calls per success")
+
+
+if __name__ == "__main__":
+    main()
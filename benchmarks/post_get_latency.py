@@ -0,0 +1,60 @@
+"""
+Measures the latency of /post/get against a running API.
+
+Usage:
+    python -m benchmarks.post_get_latency --token <access token> --post-id <post id> [--requests 500] [--concurrency 8]
+
+Start the API against a local mongod, then run this script once per build to compare:
+check out the commit before the /post/get rework, start the API and run the benchmark,
+then repeat on the current tree with the same database, token and post. The
+token is the access token returned by /login, sent as the "token" cookie.
+"""
+import argparse
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from handlers.config import API_HOST, API_PORT
+
+
+def timed_request(session, url, token, post_id):
+    """Sends one /post/get request and returns its latency in milliseconds."""
+    start = time.perf_counter()
+    response = session.post(url, json={"post_id": post_id}, cookies={"token": token})
+    elapsed = (time.perf_counter() - start) * 1000
+    response.raise_for_status()
+    return elapsed
+
+
+def percentile(latencies, fraction):
+    """Returns the latency below which the given fraction of the requests completed."""
+    ordered = sorted(latencies)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the latency of /post/get.")
+    parser.add_argument("--url", default=f"http://{API_HOST}:{API_PORT}/post/get", help="URL of the /post/get endpoint")
+    parser.add_argument("--token", required=True, help="access token of the reading user")
+    parser.add_argument("--post-id", required=True, help="ID of the post to read")
+    parser.add_argument("--requests", type=int, default=500, help="number of measured requests")
+    parser.add_argument("--concurrency", type=int, default=8, help="requests in flight at once")
+    args = parser.parse_args()
+
+    session = requests.Session()
+    # Warm up the connection pool and the author profile cache
+    for _ in range(10):
+        timed_request(session, args.url, args.token, args.post_id)
+
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        latencies = list(executor.map(
+            lambda _: timed_request(session, args.url, args.token, args.post_id), range(args.requests)
+        ))
+
+    print(f"{args.requests} requests, concurrency {args.concurrency}")
+    print(f"mean {statistics.mean(latencies):.2f} ms, p50 {percentile(latencies, 0.5):.2f} ms, "
+          f"p95 {percentile(latencies, 0.95):.2f} ms, p99 {percentile(latencies, 0.99):.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Benchmarks the ranking stage of recommend_content on synthetic candidate pools.
+
+Usage:
+    python -m benchmarks.recommendation_scoring [--top 20] [--repeat 20]
+
+Compares `rank_posts` (every candidate scored once, heap-based top-K selection) with
+the previous ranking, which sorted the whole pool by score and scored every post a
+second time to shuffle posts sharing the same score. Needs the API configuration
+(.env) to import the recommendation module, but no database.
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+from algorithm.recommendation import calculate_post_score, rank_posts
+
+POOL_SIZES = (200, 2000, 20000)
+TAGS = [f"#tag-{index}" for index in range(60)]
+
+
+def previous_rank_posts(posts, user_interests, now, limit):
+    """The ranking before the single-pass scoring, kept as the baseline of the benchmark."""
+    def post_score(post):
+        return calculate_post_score(post, user_interests, now)
+
+    ranked_posts = sorted(posts, key=post_score, reverse=True)
+    grouped_posts = {}
+    for post in ranked_posts:
+        grouped_posts.setdefault(post_score(post), []).append(post)
+    final_posts = []
+    for posts in grouped_posts.values():
+        random.shuffle(posts)
+        final_posts.extend(posts)
+    return final_posts[:limit]
+
+
+def make_posts(count, now):
+    """Generates candidate posts with random tags, engagement and age."""
+    return [
+        {
+            "post_id": str(index),
+            "tags": random.sample(TAGS, 5),
+            "likes": {"count": random.randint(0, 200)},
+            "dislikes": {"count": random.randint(0, 50)},
+            "comment_count": random.randint(0, 40),
+            "views": random.randint(0, 5000),
+            "created_on": now - timedelta(days=random.randint(0, 30)),
+        }
+        for index in range(count)
+    ]
+
+
+def measure(rank, posts, user_interests, now, limit, repeat):
+    """Returns the average time of a ranking in milliseconds."""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        rank(posts, user_interests, now, limit)
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the recommendation ranking stage.")
+    parser.add_argument("--top", type=int, default=20, help="number of posts kept (max_posts)")
+    parser.add_argument("--repeat", type=int, default=20, help="rankings averaged per pool size")
+    args = parser.parse_args()
+
+    random.seed(0)
+    now = datetime.utcnow()
+    user_interests = random.sample(TAGS, 8)
+    for size in POOL_SIZES:
+        posts = make_posts(size, now)
+        before = measure(previous_rank_posts, posts, user_interests, now, args.top, args.repeat)
+        after = measure(rank_posts, posts, user_interests, now, args.top, args.repeat)
+        print(f"{size:>6} posts: {before:8.2f} ms -> {after:8.2f} ms ({before / after:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
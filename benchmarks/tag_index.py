@@ -0,0 +1,79 @@
+"""
+Benchmarks determine_tags against the previous per-call TF-IDF fit.
+
+Usage:
+    python -m benchmarks.tag_index [--posts 500] [--seed 0]
+
+The previous implementation fitted a new TfidfVectorizer on the post and every
+cleaned tag of resources/tags.json for each post. The fitted index transforms the
+post and computes one sparse product with the tag matrix, and tags whole lists of
+posts in one product. Both pick the same tags for the same random state, which the
+benchmark checks on every post.
+"""
+import argparse
+import random
+import time
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.metrics.pairwise import cosine_similarity
+from handlers.config import all_subcategories
+from generators.tagsystem import TagIndex, clean_text, determine_tags
+
+
+def previous_determine_tags(heading, tldr, all_subcategories, min_tags=4, max_tags=6):
+    """The per-call fit before the tag index, kept as the baseline of the benchmark."""
+    post_content = clean_text(heading + " " + tldr)
+    cleaned_tags = [clean_text(tag) for tag in all_subcategories]
+    vectors = TfidfVectorizer().fit_transform([post_content] + cleaned_tags)
+    similarities = cosine_similarity(vectors[0], vectors[1:]).flatten()
+
+    sorted_tags = sorted(zip(all_subcategories, similarities), key=lambda x: x[1], reverse=True)
+    relevant_tags = [tag for tag, score in sorted_tags if score > 0.1]
+    num_tags_to_return = random.randint(min_tags, max_tags)
+    selected_tags = relevant_tags[:num_tags_to_return]
+    if len(selected_tags) < num_tags_to_return:
+        remaining_tags = [tag for tag, _ in sorted_tags if tag not in selected_tags]
+        selected_tags += remaining_tags[:num_tags_to_return - len(selected_tags)]
+    return selected_tags
+
+
+def make_posts(count):
+    """Generates (heading, tldr) pairs from the words of the tags and some filler words."""
+    words = [word for tag in all_subcategories for word in tag.strip("#").split("-")]
+    words += ["the", "a", "guide", "how", "to", "build", "fast", "with"]
+    return [(" ".join(random.choices(words, k=8)), " ".join(random.choices(words, k=40))) for _ in range(count)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the fitted tag index.")
+    parser.add_argument("--posts", type=int, default=500, help="number of synthetic posts")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the synthetic posts")
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    posts = make_posts(args.posts)
+
+    start = time.perf_counter()
+    tag_index = TagIndex(all_subcategories)
+    print(f"index built in {(time.perf_counter() - start) * 1000:.1f} ms for {len(all_subcategories)} tags")
+
+    identical = 0
+    for heading, tldr in posts:
+        random.seed(1)
+        previous = previous_determine_tags(heading, tldr, all_subcategories)
+        random.seed(1)
+        identical += previous == determine_tags(heading, tldr, all_subcategories)
+    print(f"identical tags for {identical}/{len(posts)} posts")
+
+    for name, tag_post in (("per-call fit", previous_determine_tags), ("fitted index", determine_tags)):
+        start = time.perf_counter()
+        for heading, tldr in posts:
+            tag_post(heading, tldr, all_subcategories)
+        print(f"{name}: {(time.perf_counter() - start) / len(posts) * 1000:.3f} ms/post")
+
+    start = time.perf_counter()
+    tag_index.determine_tags(posts)
+    print(f"fitted index, one batch: {(time.perf_counter() - start) / len(posts) * 1000:.3f} ms/post")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,12 @@
 import os
 import requests
 from bs4 import BeautifulSoup
-from generators.gen_post_info import process_heading  # Import process_heading
+from generators.gen_post_info import process_heading, process_headings  # Import process_heading and process_headings
 from handlers.create_system_posts import create_post_without_token  # Import create_post_without_token
 
 # Persistent storage for the latest fetched post titles (log file)
 POST_LOG_FILE = os.path.join("logs", "freecodecamp.log")
-MAX_RETRIES = 6  # Maximum number of retries for generating TLDR and tags
+MAX_RETRIES = 2  # Maximum number of retries for generating TLDR and tags (invalid output is already repaired per generation)
 
 
 def get_latest_post_titles():
@@ -24,7 +24,7 @@ def save_latest_post_titles(titles):
         file.write("\n".join(titles))
 
 
-def ensure_tldr_and_tags(heading, current_tldr, current_tags):
+async def ensure_tldr_and_tags(heading, current_tldr, current_tags):
     """
     Ensure that the TLDR and tags are populated by retrying `process_heading` if they are missing.
     :param heading: The post heading.
@@ -34,7 +34,7 @@ def ensure_tldr_and_tags(heading, current_tldr, current_tags):
     """
     retries = 0
     while (not current_tldr or not current_tags) and retries < MAX_RETRIES:
-        processed_data = process_heading(heading)
+        processed_data = await process_heading(heading)
         current_tldr = current_tldr or processed_data.get("tldr", "")
         current_tags = current_tags or processed_data.get("tags", [])
         retries += 1
@@ -63,9 +63,10 @@ async def fetch_posts_from_freecodecamp(num_of_posts=5):
 
     latest_post_titles = get_latest_post_titles()
     new_titles = set()
+    pending_posts = []
 
     for post in post_cards:
-        if len(new_titles) >= num_of_posts:
+        if len(pending_posts) >= num_of_posts:
             break
 
         anchor = post.find("a")
@@ -97,13 +98,17 @@ async def fetch_posts_from_freecodecamp(num_of_posts=5):
             if source and "srcset" in source.attrs:
                 image_url = source["srcset"]
 
-        # Generate TLDR and tags using process_heading
-        processed_data = process_heading(post_heading)
+        pending_posts.append((post_title, post_heading, image_url, post_url))
+
+    # Generate TLDR and tags of all the new posts in batched prompts
+    processed_posts = await process_headings([post_heading for _, post_heading, _, _ in pending_posts])
+
+    for (post_title, post_heading, image_url, post_url), processed_data in zip(pending_posts, processed_posts):
         tldr = processed_data.get("tldr", "")
         tags = processed_data.get("tags", [])
 
         # Ensure TLDR and tags are populated
-        tldr, tags = ensure_tldr_and_tags(post_heading, tldr, tags)
+        tldr, tags = await ensure_tldr_and_tags(post_heading, tldr, tags)
 
         # Call the create_post_without_token function to create the post in the database
         user_name = "FreeCodeCamp"
@@ -4,12 +4,12 @@ import re
 import random
 import datetime
 from datetime import timedelta
-from generators.gen_post_info import process_post  # Import process_heading
+from generators.gen_post_info import process_post, process_posts  # Import process_post and process_posts
 from handlers.create_system_posts import create_post_without_token  # Import create_post_without_token
 
 # Persistent storage for the latest fetched post titles (log file)
 POST_LOG_FILE = os.path.join("logs", "medium_posts.log")
-MAX_RETRIES = 6  # Maximum number of retries for generating TLDR and tags
+MAX_RETRIES = 2  # Maximum number of retries for generating TLDR and tags (invalid output is already repaired per generation)
 # Define the time limit for recent posts (2 weeks ago)
 TWO_WEEKS_AGO = datetime.datetime.now() - timedelta(weeks=2)
 
@@ -63,12 +63,12 @@ def get_summary_text(summary):
     return ". ".join(sentences[:3]) + "." if sentences else clean_summary
 
 
-def ensure_tldr_and_tags(heading, description):
-    """Ensure that TLDR and tags are populated by retrying `process_heading`."""
+async def ensure_tldr_and_tags(heading, description, tldr="", tags=None):
+    """Ensure that TLDR and tags are populated by retrying `process_post`."""
     retries = 0
-    tldr, tags = "", []
+    tags = tags or []
     while (not tldr or not tags) and retries < MAX_RETRIES:
-        processed_data = process_post(heading, description)
+        processed_data = await process_post(heading, description)
         tldr = tldr or processed_data.get("tldr", "")
         tags = tags or processed_data.get("tags", [])
         retries += 1
@@ -84,6 +84,7 @@ async def fetch_and_save_medium_posts(num_of_posts=5):
     """Fetch posts from Medium RSS feeds and save them."""
     latest_post_titles = get_latest_post_titles()
     new_titles = set()
+    pending_posts = []
 
     for user in MEDIUM_USERS:
         rss_url = f"https://medium.com/feed/{user}"
@@ -119,37 +120,45 @@ async def fetch_and_save_medium_posts(num_of_posts=5):
             if image_match:
                 image_url = image_match.group(1)
 
-            # Generate TLDR and tags
-            tldr, tags = ensure_tldr_and_tags(heading, description)
-            print(tldr, tags)
-            
-            # Prepare the data for posting
-            post_data = {
-                "post_id": generate_post_id(),
-                "user_name": "Medium",
-                "user_pfp": "https://favicon.im/medium.com",
-                "heading": heading,
-                "image_url": image_url,
-                "tldr": tldr,
-                "description": description,
-                "tags": tags
-            }
-
-            # Save the post using the create_post_without_token function
-            response = await create_post_without_token(
-                user_name=post_data["user_name"],
-                user_pfp=post_data["user_pfp"],
-                heading=post_data["heading"],
-                tldr=post_data["tldr"],
-                image=post_data["image_url"],
-                tags=post_data["tags"],
-                post_link=post_link,
-            )
-
-            print(f"Response from create_post_without_token: {response}")
-
-            # Add the title to the new_titles set
-            new_titles.add(heading)
+            pending_posts.append((heading, description, image_url, post_link))
+
+    # Generate the TLDR and tags of all the new posts in batched prompts
+    processed_posts = await process_posts([(heading, description) for heading, description, _, _ in pending_posts])
+
+    for (heading, description, image_url, post_link), processed_data in zip(pending_posts, processed_posts):
+        # Ensure TLDR and tags are populated
+        tldr, tags = await ensure_tldr_and_tags(
+            heading, description, processed_data.get("tldr", ""), processed_data.get("tags", [])
+        )
+        print(tldr, tags)
+
+        # Prepare the data for posting
+        post_data = {
+            "post_id": generate_post_id(),
+            "user_name": "Medium",
+            "user_pfp": "https://favicon.im/medium.com",
+            "heading": heading,
+            "image_url": image_url,
+            "tldr": tldr,
+            "description": description,
+            "tags": tags
+        }
+
+        # Save the post using the create_post_without_token function
+        response = await create_post_without_token(
+            user_name=post_data["user_name"],
+            user_pfp=post_data["user_pfp"],
+            heading=post_data["heading"],
+            tldr=post_data["tldr"],
+            image=post_data["image_url"],
+            tags=post_data["tags"],
+            post_link=post_link,
+        )
+
+        print(f"Response from create_post_without_token: {response}")
+
+        # Add the title to the new_titles set
+        new_titles.add(heading)
 
     # Update the persistent storage with new titles
     save_latest_post_titles(latest_post_titles.union(new_titles))
@@ -1,6 +1,15 @@
-import ollama
+import asyncio
 import json
 import re
+from generators.llm_client import llm_client
+from generators.generation_cache import generation_cache
+from handlers.config import LLM_CONTEXT_TOKENS
+
+PROMPT_VERSION = 3  # Bump whenever the prompts or their parsing below change, older cached generations are then ignored
+GENERATION_REPAIR_ATTEMPTS = 2  # Repair prompts sent after an invalid generation before giving up
+BATCH_MAX_ITEMS = 8  # Maximum number of posts enriched by a single batched generation
+BATCH_OUTPUT_TOKENS_PER_ITEM = 200  # Tokens reserved in the context window for the tags and TLDR of each post
+BATCH_DESCRIPTION_WORDS = 300  # Descriptions are truncated to this many words in batched prompts
 
 
 def truncate_text_to_word_limit(text, word_limit=490):
@@ -29,8 +38,174 @@ def truncate_text_to_word_limit(text, word_limit=490):
         return truncated_text.strip()
 
 
+def extract_json_object(text: str):
+    """
+    Extracts the first JSON object from noisy model output (code fences, text around it).
+
+    Args:
+        text (str): The text generated by the model.
+
+    Returns:
+        dict: The first JSON object found, or None.
+    """
+    decoder = json.JSONDecoder()
+    index = text.find("{")
+    while index != -1:
+        try:
+            value, _ = decoder.raw_decode(text, index)
+            if isinstance(value, dict):
+                return value
+        except json.JSONDecodeError:
+            pass
+        index = text.find("{", index + 1)
+    return None
+
+
+def validate_generation(data: dict):
+    """
+    Validates and normalizes the tags and TLDR of a generation.
+
+    Args:
+        data (dict): The JSON object generated by the model.
+
+    Returns:
+        tuple: The valid fields, and the problems of the invalid ones by field.
+    """
+    valid, problems = {}, {}
+
+    tags = data.get("tags")
+    if isinstance(tags, str):
+        tags = tags.split(",")
+    if isinstance(tags, list):
+        tags = [tag.strip() for tag in tags if isinstance(tag, str) and tag.strip()]
+    if tags:
+        valid["tags"] = tags
+    else:
+        problems["tags"] = '"tags" must be a non-empty list of strings'
+
+    tldr = data.get("tldr")
+    if isinstance(tldr, str) and tldr.strip():
+        # Truncate TLDR to 400 words and ensure it ends with a complete sentence
+        valid["tldr"] = truncate_text_to_word_limit(tldr.strip(), word_limit=400)
+    else:
+        problems["tldr"] = '"tldr" must be a non-empty string'
+
+    return valid, problems
+
+
+def repair_prompt(task: str, output: str, valid: dict, problems: dict):
+    """
+    Builds the prompt asking the model to fix an invalid generation.
+
+    The model keeps no state between calls, so the original task (with the heading and
+    description of the post) is repeated for the repaired fields to be based on the post.
+
+    Args:
+        task (str): The original generation prompt.
+        output (str): The invalid text generated by the model.
+        valid (dict): The fields of the generation that are already valid.
+        problems (dict): The problems of the invalid fields.
+
+    Returns:
+        str: The repair prompt.
+    """
+    missing = [field for field in ("tags", "tldr") if field not in valid]
+    return f"""
+    {task.strip()}
+
+    Your previous output for this task was not valid:
+    {output[:2000]}
+
+    Problems: {"; ".join(problems.values()) if problems else "it does not contain a JSON object"}.
+    Return only a JSON object with the field(s) {", ".join(f'"{field}"' for field in missing)}, where
+    "tags" is a list of six or more short tag strings and "tldr" is a summary string under 400 characters.
+    """
+
+
+class GenerationStats:
+    """Counts the model calls made per successful tags and TLDR generation."""
+
+    def __init__(self):
+        self.generations = 0
+        self.successes = 0
+        self.calls = 0
+        self.repairs = 0
+        self.batches = 0
+        self.batch_fallbacks = 0
+
+    def get_metrics(self):
+        """Returns the generation counters and the average number of calls per success."""
+        return {
+            "generations": self.generations,
+            "successes": self.successes,
+            "calls": self.calls,
+            "repairs": self.repairs,
+            "batches": self.batches,
+            "batch_fallbacks": self.batch_fallbacks,
+            "calls_per_success": round(self.calls / self.successes, 2) if self.successes else None,
+        }
+
+
+generation_stats = GenerationStats()
+
+
+async def generate_structured(prompt: str):
+    """
+    Generates tags and a TLDR in JSON mode, repairing invalid output with targeted prompts.
+
+    Only the fields that are still missing or invalid are asked for again, the valid
+    ones are kept from the previous attempts.
+
+    Args:
+        prompt (str): The generation prompt.
+
+    Returns:
+        dict: The generated tags and TLDR, or an error.
+    """
+    generation_stats.generations += 1
+    valid, problems = {}, {}
+    for attempt in range(GENERATION_REPAIR_ATTEMPTS + 1):
+        if attempt:
+            generation_stats.repairs += 1
+            attempt_prompt = repair_prompt(prompt, output, valid, problems)
+        else:
+            attempt_prompt = prompt
+        generation_stats.calls += 1
+        output = await llm_client.generate(attempt_prompt, format="json")
+
+        data = extract_json_object(output)
+        if data is None:
+            problems = {}
+            continue
+        fields, problems = validate_generation(data)
+        valid = {**fields, **valid}
+        problems = {field: problem for field, problem in problems.items() if field not in valid}
+        if not problems:
+            generation_stats.successes += 1
+            return valid
+
+    return {"error": "; ".join(problems.values()) or "No JSON object in the generation.", **valid}
+
+
 # Function to generate tags and TLDR using Ollama
-def process_post(heading: str, description: str):
+async def process_post(heading: str, description: str):
+    """
+    Returns the tags and TLDR of a post, generated once per heading and description.
+
+    Args:
+        heading (str): The heading of the post.
+        description (str): The description of the post.
+
+    Returns:
+        dict: A dictionary containing generated tags and TLDR.
+    """
+    key = generation_cache.make_key(llm_client.model, PROMPT_VERSION, "post", heading, description)
+    return await generation_cache.get_or_generate(
+        key, lambda: generate_post_info(heading, description), llm_client.model, PROMPT_VERSION, "post"
+    )
+
+
+async def generate_post_info(heading: str, description: str):
     """
     Uses Ollama to generate tags and a TLDR for a post based on its heading and description.
 
@@ -59,32 +234,33 @@ def process_post(heading: str, description: str):
         }}
         """
 
-        # Send the prompt to Ollama and get the response
-        response = ollama.generate(model="llava:7b", prompt=prompt)
-        
-        if 'response' in response:
-            result = response['response']
-            
-            # Assuming the response is a string in JSON format, try to parse it
-            try:
-                result_dict = json.loads(result)
-
-                # Truncate TLDR to 490 words and ensure it ends with a complete sentence
-                if "tldr" in result_dict:
-                    result_dict["tldr"] = truncate_text_to_word_limit(result_dict["tldr"], word_limit=400)
-
-                return result_dict
-            except json.JSONDecodeError as e:
-                return {"error": f"Failed to decode JSON: {str(e)}"}
-        else:
-            return {"error": "No response field found in the Ollama output."}
+        # Send the prompt to Ollama in JSON mode, repairing invalid output
+        return await generate_structured(prompt)
 
+    except asyncio.TimeoutError:
+        return {"error": "The generation timed out."}
     except Exception as e:
         return {"error": str(e)}
 
 
 # Function to generate tags and TLDR using Ollama based on heading only
-def process_heading(heading: str):
+async def process_heading(heading: str):
+    """
+    Returns the tags and TLDR of a post, generated once per heading.
+
+    Args:
+        heading (str): The heading of the post.
+
+    Returns:
+        dict: A dictionary containing generated tags and TLDR.
+    """
+    key = generation_cache.make_key(llm_client.model, PROMPT_VERSION, "heading", heading)
+    return await generation_cache.get_or_generate(
+        key, lambda: generate_heading_info(heading), llm_client.model, PROMPT_VERSION, "heading"
+    )
+
+
+async def generate_heading_info(heading: str):
     """
     Uses Ollama to generate tags and a TLDR for a post based on its heading.
 
@@ -111,25 +287,204 @@ def process_heading(heading: str):
         }}
         """
 
-        # Send the prompt to Ollama and get the response
-        response = ollama.generate(model="llava:7b", prompt=prompt)
+        # Send the prompt to Ollama in JSON mode, repairing invalid output
+        return await generate_structured(prompt)
 
-        if 'response' in response:
-            result = response['response']
-            
-            # Assuming the response is a string in JSON format, try to parse it
-            try:
-                result_dict = json.loads(result)
+    except asyncio.TimeoutError:
+        return {"error": "The generation timed out."}
+    except Exception as e:
+        return {"error": str(e)}
 
-                # Truncate TLDR to 490 words and ensure it ends with a complete sentence
-                if "tldr" in result_dict:
-                    result_dict["tldr"] = truncate_text_to_word_limit(result_dict["tldr"], word_limit=400)
 
-                return result_dict
-            except json.JSONDecodeError as e:
-                return {"error": f"Failed to decode JSON: {str(e)}"}
-        else:
-            return {"error": "No response field found in the Ollama output."}
+async def stream_tldr(heading: str, description: str):
+    """
+    Streams a TLDR of a post as the model generates it.
+
+    Args:
+        heading (str): The heading of the post.
+        description (str): The description of the post.
+
+    Yields:
+        str: The next piece of the TLDR.
+    """
+    prompt = f"""
+    You are an expert summarizer.
+    Create a TLDR (Too Long; Didn't Read) version of the description of this blog post, focusing on its main points,
+    under 400 characters. Reply with the TLDR only.
+    - Heading: "{heading}"
+    - Description: "{description}"
+    """
+    async for text in llm_client.stream(prompt):
+        yield text
+
+
+async def get_cached_tldr(heading: str, description: str):
+    """Returns the TLDR of a post streamed by `stream_tldr` and stored with `cache_tldr`, or None."""
+    cached = await generation_cache.get(generation_cache.make_key(llm_client.model, PROMPT_VERSION, "tldr", heading, description))
+    return cached["tldr"] if cached else None
+
+
+async def cache_tldr(heading: str, description: str, tldr: str):
+    """Stores a streamed TLDR under its own cache kind, apart from the tags and TLDR of `process_post`."""
+    key = generation_cache.make_key(llm_client.model, PROMPT_VERSION, "tldr", heading, description)
+    await generation_cache.put(key, {"tldr": tldr}, llm_client.model, PROMPT_VERSION, "tldr")
+
+
+def estimate_tokens(text: str):
+    """Roughly estimates the number of tokens of a text (about four characters per token)."""
+    return len(text) // 4 + 1
+
+
+def plan_batches(items: list, prompt_tokens: int):
+    """
+    Splits items into batches fitting in the context window of the model.
+
+    Args:
+        items (list): The (index, prompt item) pairs to batch.
+        prompt_tokens (int): Estimated tokens of the batch instructions.
+
+    Returns:
+        list: The batches of (index, prompt item) pairs.
+    """
+    batches, batch, used = [], [], prompt_tokens
+    for item in items:
+        tokens = estimate_tokens(json.dumps(item[1], ensure_ascii=False)) + BATCH_OUTPUT_TOKENS_PER_ITEM
+        if batch and (len(batch) >= BATCH_MAX_ITEMS or used + tokens > LLM_CONTEXT_TOKENS):
+            batches.append(batch)
+            batch, used = [], prompt_tokens
+        batch.append(item)
+        used += tokens
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+BATCH_PROMPT = """
+    You are an expert tag generator and summarizer.
+    For every blog post of the list below, generate six or more relevant and accurate tags, and a TLDR
+    (Too Long; Didn't Read) focusing on its main points, under 400 characters.
+
+    Posts:
+    {posts}
+
+    Return your output in the following JSON format, with one entry per post and the same ids:
+    {{
+        "posts": [
+            {{"id": 0, "tags": ["tag1", "tag2", "tag3", "tag4", "tag5", "tag6"], "tldr": "A short summary."}}
+        ]
+    }}
+    """
+
+
+async def generate_batch(kind: str, batch: list):
+    """
+    Generates the tags and TLDR of several posts in one prompt.
+
+    Args:
+        kind (str): "post" or "heading".
+        batch (list): The (index, prompt item) pairs of the posts.
 
+    Returns:
+        dict: The valid results by index. Posts missing from the output or failing
+        validation are left out.
+    """
+    posts = "\n    ".join(
+        json.dumps({"id": number, **item}, ensure_ascii=False) for number, (_, item) in enumerate(batch)
+    )
+    generation_stats.batches += 1
+    generation_stats.calls += 1
+    try:
+        output = await llm_client.generate(
+            BATCH_PROMPT.format(posts=posts), format="json", options={"num_ctx": LLM_CONTEXT_TOKENS}
+        )
     except Exception as e:
-        return {"error": str(e)}
+        print(f"Error generating a batch of {len(batch)} {kind}s: {e}")
+        return {}
+
+    data = extract_json_object(output) or {}
+    entries = data.get("posts") if isinstance(data.get("posts"), list) else []
+    results = {}
+    for entry in entries:
+        if not isinstance(entry, dict) or not isinstance(entry.get("id"), int) or not 0 <= entry["id"] < len(batch):
+            continue
+        valid, problems = validate_generation(entry)
+        if not problems:
+            results[batch[entry["id"]][0]] = valid
+    generation_stats.generations += len(results)
+    generation_stats.successes += len(results)
+    return results
+
+
+async def enrich_batch(kind: str, inputs: list):
+    """
+    Returns the tags and TLDR of several posts, packing the uncached ones into batched prompts.
+
+    Posts that are missing from a batched output or fail validation fall back to the
+    single-post generation (with its repair prompts).
+
+    Args:
+        kind (str): "post" for (heading, description) inputs, "heading" for heading inputs.
+        inputs (list): The inputs of the posts.
+
+    Returns:
+        list: The generated tags and TLDR (or an error) of every post, in the order of the inputs.
+    """
+    single = process_post if kind == "post" else process_heading
+    keys = [generation_cache.make_key(llm_client.model, PROMPT_VERSION, kind, *post_input) for post_input in inputs]
+    results = list(await asyncio.gather(*(generation_cache.get(key) for key in keys)))
+
+    pending = []
+    for index, post_input in enumerate(inputs):
+        if results[index] is None:
+            item = {"heading": post_input[0]}
+            if kind == "post":
+                item["description"] = truncate_text_to_word_limit(post_input[1], word_limit=BATCH_DESCRIPTION_WORDS)
+            pending.append((index, item))
+
+    batches = plan_batches(pending, estimate_tokens(BATCH_PROMPT))
+    # A batch of one post gains nothing over the single-post generation
+    batched = await asyncio.gather(*(generate_batch(kind, batch) for batch in batches if len(batch) > 1))
+    for generated in batched:
+        for index, result in generated.items():
+            results[index] = result
+            await generation_cache.put(keys[index], result, llm_client.model, PROMPT_VERSION, kind)
+
+    fallbacks = [index for index, result in enumerate(results) if result is None]
+    generation_stats.batch_fallbacks += len(fallbacks)
+    for index, result in zip(fallbacks, await asyncio.gather(*(single(*inputs[index]) for index in fallbacks))):
+        results[index] = result
+    return results
+
+
+async def process_posts(posts: list):
+    """
+    Generates the tags and TLDR of several posts from their headings and descriptions.
+
+    Args:
+        posts (list): The (heading, description) pairs of the posts.
+
+    Returns:
+        list: A dictionary containing generated tags and TLDR for every post, in order.
+    """
+    return await enrich_batch("post", [(heading, description) for heading, description in posts])
+
+
+async def process_headings(headings: list):
+    """
+    Generates the tags and TLDR of several posts from their headings.
+
+    Args:
+        headings (list): The headings of the posts.
+
+    Returns:
+        list: A dictionary containing generated tags and TLDR for every post, in order.
+    """
+    return await enrich_batch("heading", [(heading,) for heading in headings])
+
+
+async def purge_stale_generations():
+    """Deletes the cached generations made with an older version of the prompts."""
+    deleted = 0
+    for kind in ("post", "heading", "tldr"):
+        deleted += await generation_cache.purge_stale(kind, PROMPT_VERSION)
+    return deleted
@@ -1,7 +1,8 @@
+import asyncio
 import json
-import ollama
+from generators.llm_client import llm_client
 
-def generate_role_tag(tags: list) -> dict:
+async def generate_role_tag(tags: list) -> dict:
     """
     Uses Ollama to generate achievement role names and tag names based on a list of tags.
     
@@ -39,17 +40,15 @@ def generate_role_tag(tags: list) -> dict:
         """
 
         # Send the prompt to Ollama and get the response
-        response = ollama.generate(model="llava:7b", prompt=prompt)
-        if 'response' in response:
-            result = response['response']  
-            # Assuming the response is a string in JSON format, try to parse it
-            try:
-                result_dict = json.loads(result)
-                return result_dict
-            except json.JSONDecodeError as e:
-                return {"error": f"Failed to decode JSON: {str(e)}"}
-        else:
-            return {"error": "No response field found in the Ollama output."}
+        result = await llm_client.generate(prompt)
+        # Assuming the response is a string in JSON format, try to parse it
+        try:
+            result_dict = json.loads(result)
+            return result_dict
+        except json.JSONDecodeError as e:
+            return {"error": f"Failed to decode JSON: {str(e)}"}
 
+    except asyncio.TimeoutError:
+        return {"error": "The generation timed out."}
     except Exception as e:
         return {"error": str(e)}
\ No newline at end of file
@@ -0,0 +1,167 @@
+import asyncio
+import copy
+import hashlib
+import json
+from collections import OrderedDict
+from datetime import datetime
+from handlers.config import generation_cache_collection
+
+GENERATION_CACHE_SIZE = 1024  # Maximum number of generations kept in memory
+GENERATION_CACHE_TTL_SECONDS = 30 * 24 * 60 * 60  # Stored generations expire after 30 days
+
+
+class GenerationCache:
+    """
+    Content-addressed cache of LLM generations.
+
+    Entries are keyed by a hash of the model, the prompt version and the generation
+    inputs, so an unchanged heading/description is never sent to the model twice. An
+    in-memory LRU sits in front of generation_cache_collection, and concurrent
+    requests for the same key share a single generation. Bumping the prompt version
+    makes every older entry unreachable, and `purge_stale` deletes them.
+    """
+
+    def __init__(self, size: int = GENERATION_CACHE_SIZE):
+        self.size = size
+        self.entries = OrderedDict()
+        self.inflight = {}
+        self.memory_hits = 0
+        self.database_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(model: str, prompt_version: int, kind: str, *inputs: str) -> str:
+        """Hashes the model, prompt version, generation kind and inputs into a cache key."""
+        payload = json.dumps([model, prompt_version, kind, *inputs], ensure_ascii=False)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    async def get_or_generate(self, key: str, generate, model: str, prompt_version: int, kind: str):
+        """
+        Returns the cached generation of a key, generating and storing it on a miss.
+
+        Results containing an "error" are returned but never cached.
+
+        Args:
+            key (str): The cache key (see `make_key`).
+            generate: Coroutine function producing the result dict on a miss.
+            model (str): The model of the generation, stored for invalidation.
+            prompt_version (int): The prompt version of the generation, stored for invalidation.
+            kind (str): The kind of generation (e.g. "post" or "heading").
+
+        Returns:
+            dict: A copy of the generated result.
+        """
+        if key in self.entries:
+            return await self.get(key)
+
+        # Identical concurrent requests wait for the same generation
+        if key in self.inflight:
+            return copy.deepcopy(await asyncio.shield(self.inflight[key]))
+
+        future = asyncio.get_running_loop().create_future()
+        self.inflight[key] = future
+        try:
+            result = await self._lookup_or_generate(key, generate, model, prompt_version, kind)
+            future.set_result(result)
+            return copy.deepcopy(result)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # Marks the exception as retrieved when nobody else is waiting
+            raise
+        finally:
+            self.inflight.pop(key, None)
+
+    async def get(self, key: str):
+        """
+        Returns the cached generation of a key without generating it.
+
+        Args:
+            key (str): The cache key (see `make_key`).
+
+        Returns:
+            dict: A copy of the cached result, or None on a miss.
+        """
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            self.memory_hits += 1
+            return copy.deepcopy(self.entries[key])
+
+        stored = await generation_cache_collection.find_one({"key": key}, {"_id": 0, "result": 1})
+        if stored:
+            self.database_hits += 1
+            self._remember(key, stored["result"])
+            return copy.deepcopy(stored["result"])
+
+        self.misses += 1
+        return None
+
+    async def put(self, key: str, result: dict, model: str, prompt_version: int, kind: str):
+        """
+        Stores a generation. Results containing an "error" are ignored.
+
+        Args:
+            key (str): The cache key (see `make_key`).
+            result (dict): The generated result.
+            model (str): The model of the generation.
+            prompt_version (int): The prompt version of the generation.
+            kind (str): The kind of generation.
+        """
+        if "error" in result:
+            return
+        await generation_cache_collection.update_one(
+            {"key": key},
+            {"$set": {
+                "result": result,
+                "kind": kind,
+                "model": model,
+                "prompt_version": prompt_version,
+                "created_on": datetime.utcnow(),
+            }},
+            upsert=True
+        )
+        self._remember(key, copy.deepcopy(result))
+
+    async def _lookup_or_generate(self, key: str, generate, model: str, prompt_version: int, kind: str):
+        stored = await self.get(key)
+        if stored is not None:
+            return stored
+
+        result = await generate()
+        await self.put(key, result, model, prompt_version, kind)
+        return result
+
+    def _remember(self, key: str, result: dict):
+        self.entries[key] = result
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.size:
+            self.entries.popitem(last=False)
+
+    async def purge_stale(self, kind: str, prompt_version: int):
+        """
+        Deletes the stored generations of a kind made with another prompt version.
+
+        Args:
+            kind (str): The kind of generation.
+            prompt_version (int): The current prompt version of that kind.
+
+        Returns:
+            int: Number of deleted entries.
+        """
+        self.entries.clear()
+        result = await generation_cache_collection.delete_many({"kind": kind, "prompt_version": {"$ne": prompt_version}})
+        return result.deleted_count
+
+    def get_metrics(self):
+        """Returns the cache size and hit/miss counters."""
+        return {
+            "size": len(self.entries),
+            "memory_hits": self.memory_hits,
+            "database_hits": self.database_hits,
+            "misses": self.misses,
+        }
+
+
+generation_cache = GenerationCache()
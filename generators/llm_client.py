@@ -0,0 +1,103 @@
+import asyncio
+import ollama
+from handlers.config import MODEL_TO_USE, LLM_MAX_CONCURRENCY, LLM_TIMEOUT
+
+
+class LLMClient:
+    """
+    Shared asynchronous Ollama client used by every generator.
+
+    A single `ollama.AsyncClient` (and therefore a single pooled HTTP connection set)
+    is reused for every call, and a semaphore caps the number of generations in flight
+    so a burst of posts queues up here instead of overloading the model server.
+    Cancelling the awaiting task (or hitting the timeout) aborts the HTTP request.
+    """
+
+    def __init__(self, model: str = MODEL_TO_USE, max_concurrency: int = LLM_MAX_CONCURRENCY, timeout: float = LLM_TIMEOUT):
+        self.model = model
+        self.timeout = timeout
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.client = None
+        self.calls = 0
+        self.timeouts = 0
+
+    def _get_client(self):
+        # Created lazily so the HTTP connection pool belongs to the running event loop
+        if self.client is None:
+            self.client = ollama.AsyncClient()
+        return self.client
+
+    async def generate(self, prompt: str, timeout: float = None, **kwargs) -> str:
+        """
+        Generates a completion for a prompt.
+
+        Args:
+            prompt (str): The prompt to send to the model.
+            timeout (float): Seconds to wait for the completion, defaults to LLM_TIMEOUT.
+            **kwargs: Extra arguments passed to `ollama.AsyncClient.generate` (e.g. format, options).
+
+        Returns:
+            str: The generated text.
+
+        Raises:
+            asyncio.TimeoutError: If the generation did not finish in time.
+            ollama.ResponseError: If the model server rejected the request.
+        """
+        async with self.semaphore:
+            self.calls += 1
+            try:
+                response = await asyncio.wait_for(
+                    self._get_client().generate(model=self.model, prompt=prompt, **kwargs),
+                    timeout=timeout or self.timeout
+                )
+            except asyncio.TimeoutError:
+                self.timeouts += 1
+                raise
+        return response["response"]
+
+    async def stream(self, prompt: str, timeout: float = None, **kwargs):
+        """
+        Generates a completion for a prompt, yielding the text as the model produces it.
+
+        Args:
+            prompt (str): The prompt to send to the model.
+            timeout (float): Seconds the whole generation may take, defaults to LLM_TIMEOUT.
+            **kwargs: Extra arguments passed to `ollama.AsyncClient.generate` (e.g. options).
+
+        Yields:
+            str: The next piece of generated text.
+
+        Raises:
+            asyncio.TimeoutError: If the generation did not finish in time.
+            ollama.ResponseError: If the model server rejected the request.
+        """
+        loop = asyncio.get_running_loop()
+        async with self.semaphore:
+            self.calls += 1
+            deadline = loop.time() + (timeout or self.timeout)
+            chunks = None
+            try:
+                chunks = await asyncio.wait_for(
+                    self._get_client().generate(model=self.model, prompt=prompt, stream=True, **kwargs),
+                    timeout=deadline - loop.time()
+                )
+                while True:
+                    try:
+                        chunk = await asyncio.wait_for(chunks.__anext__(), timeout=deadline - loop.time())
+                    except StopAsyncIteration:
+                        break
+                    yield chunk["response"]
+            except asyncio.TimeoutError:
+                self.timeouts += 1
+                raise
+            finally:
+                # Closing the response aborts the generation when the consumer stops early
+                if chunks is not None:
+                    await chunks.aclose()
+
+    def get_metrics(self):
+        """Returns the model and the call counters."""
+        return {"model": self.model, "calls": self.calls, "timeouts": self.timeouts}
+
+
+llm_client = LLMClient()
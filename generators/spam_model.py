@@ -1,27 +1,134 @@
+import os
 import re
-from resources.dataset import p_ham, p_spam, parameters_spam, parameters_ham
+from itertools import repeat
+import numpy as np
 
-def classify(message):
-   '''
-   message: a string
-   '''
+MODEL_FILE = os.path.join("resources", "spam_model.npz")
+MODEL_VERSION = 2  # Bump whenever the artifact format or the tokenizer changes
+MESSAGE_SEPARATOR = "\x00"  # Separates the messages of a batch, never part of a word
+WORD_PATTERN = re.compile(r"\w+")
+BATCH_TOKEN_PATTERN = re.compile(r"\w+|\x00")
+
+
+def tokenize(message):
+    """Splits a message into lowercase words, punctuation removed."""
+    return WORD_PATTERN.findall(message.lower())
+
+
+class SpamModel:
+    """
+    Naive Bayes spam classifier working in log space.
+
+    The parameters are trained offline by `python -m resources.dataset`, which saves
+    them as an artifact of log-probability arrays indexed by the vocabulary. Batches
+    of texts are tokenized in a single regex pass, and scored with one sparse product
+    of their word occurrences and the vector of per-word log-likelihood ratios.
+    """
+
+    def __init__(self, vocabulary, log_spam, log_ham, log_prior_spam, log_prior_ham):
+        self.index = {word: index for index, word in enumerate(vocabulary.tolist())}
+        # Batches look the separator up in the same dictionary as the words
+        self.batch_index = {**self.index, MESSAGE_SEPARATOR: -2}
+        self.log_spam = log_spam
+        self.log_ham = log_ham
+        self.log_prior_spam = float(log_prior_spam)
+        self.log_prior_ham = float(log_prior_ham)
+        # log P(word | spam) - log P(word | ham), as a vector for batches and plain floats for the word loop
+        self.word_score_vector = log_spam - log_ham
+        self.word_scores = self.word_score_vector.tolist()
+
+    def classify(self, message):
+        """
+        Classifies a message.
+
+        Args:
+            message (str): The text to classify.
+
+        Returns:
+            bool: True if the message is more likely spam than ham.
+        """
+        score = self.log_prior_spam - self.log_prior_ham
+        for word in tokenize(message):
+            index = self.index.get(word)
+            if index is not None:
+                score += self.word_scores[index]
+        return score > 0
+
+    def classify_batch(self, messages):
+        """
+        Classifies several messages with one sparse matrix-vector product.
+
+        Args:
+            messages (list): The texts to classify.
 
-   message = re.sub('\W', ' ', message)
-   message = message.lower().split()
+        Returns:
+            list: True for every message that is more likely spam than ham, in order.
+        """
+        if not messages:
+            return []
+        # A separator inside a message (JSON allows "\u0000") would split it in two, tokenize() ignores it anyway
+        text = MESSAGE_SEPARATOR.join(message.replace(MESSAGE_SEPARATOR, " ") for message in messages)
+        tokens = BATCH_TOKEN_PATTERN.findall(text.lower())
+        # Vocabulary index of every token, -1 for unknown words and -2 for separators
+        indices = np.fromiter(map(self.batch_index.get, tokens, repeat(-1)), dtype=np.int64, count=len(tokens))
+        rows = np.cumsum(indices == -2)
+        known = indices >= 0
+        # Sum of the word scores of every message (the (message x word) occurrences, in COO form, times the scores)
+        scores = np.bincount(rows[known], weights=self.word_score_vector[indices[known]], minlength=len(messages))
+        return (scores + (self.log_prior_spam - self.log_prior_ham) > 0).tolist()
+
+
+def load_spam_model(path=MODEL_FILE):
+    """
+    Loads a spam model artifact.
+
+    Args:
+        path (str): Path of the artifact saved by `python -m resources.dataset`.
+
+    Returns:
+        SpamModel: The loaded model.
+
+    Raises:
+        FileNotFoundError: If the artifact does not exist.
+        ValueError: If the artifact was saved by another version of the trainer.
+    """
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Spam model artifact {path} not found, train it with `python -m resources.dataset`")
+    with np.load(path) as artifact:
+        if int(artifact["version"]) != MODEL_VERSION:
+            raise ValueError(f"Spam model artifact {path} is outdated, retrain it with `python -m resources.dataset`")
+        return SpamModel(
+            artifact["vocabulary"], artifact["log_spam"], artifact["log_ham"],
+            artifact["log_prior_spam"], artifact["log_prior_ham"]
+        )
+
+
+spam_model = None
+
+
+def get_spam_model():
+    """Returns the spam model, loaded on first use."""
+    global spam_model
+    if spam_model is None:
+        spam_model = load_spam_model()
+    return spam_model
+
+
+def classify(message):
+    '''
+    message: a string
+    '''
+    return get_spam_model().classify(message)
 
-   p_spam_given_message = p_spam
-   p_ham_given_message = p_ham
 
-   for word in message:
-      if word in parameters_spam:
-         p_spam_given_message *= parameters_spam[word]
+def classify_batch(messages):
+    """
+    Classifies several messages at once.
 
-      if word in parameters_ham: 
-         p_ham_given_message *= parameters_ham[word]
+    Args:
+        messages (list): The texts to classify.
 
-   if p_ham_given_message > p_spam_given_message:
-      return False
-   elif p_ham_given_message < p_spam_given_message:
-      return True
-   else:
-      return False
\ No newline at end of file
+    Returns:
+        list: True for every message flagged as spam, in order.
+    """
+    return get_spam_model().classify_batch(messages)
@@ -51,7 +51,9 @@ class ChatSpark:
             post_context = ""
             if isinstance(post_ids, list):
                 for post_id in post_ids:
-                    post = await posts_collection.find_one({"post_id": post_id})
+                    post = await posts_collection.find_one(
+                        {"post_id": post_id}, {"heading": 1, "tldr": 1, "description": 1, "tags": 1}
+                    )
                     if post:
                         post_content = f"""
                         Heading: {post.get("heading", "N/A")}
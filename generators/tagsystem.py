@@ -1,8 +1,18 @@
+import os
 import re
 import random
+import threading
+import numpy as np
+from functools import lru_cache
 from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
-from handlers.config import all_subcategories
+from handlers.config import all_subcategories, tag_categories, TAG_ENGINE, TAG_EMBEDDINGS_PATH
+
+try:
+    from langchain_community.embeddings import FastEmbedEmbeddings
+except ImportError:
+    FastEmbedEmbeddings = None
+
+SEMANTIC_TAG_MARGIN = 0.05  # Tags within this cosine similarity of the best tag are relevant to a post
 
 
 def clean_text(text):
@@ -20,6 +30,179 @@ def clean_text(text):
     return text
 
 
+class TagIndex:
+    """
+    TF-IDF index of the available tags, fitted once.
+
+    The vectorizer is fitted on the cleaned tags and the tag matrix is kept with
+    L2-normalized rows, so tagging posts is a single transform and a sparse matrix
+    product (the cosine similarities), however many posts are tagged at once.
+    """
+
+    def __init__(self, tags):
+        self.tags = list(tags)
+        self.vectorizer = TfidfVectorizer()
+        # Rows are L2-normalized by the vectorizer, transposed once for the products
+        self.tag_matrix = self.vectorizer.fit_transform([clean_text(tag) for tag in self.tags]).T.tocsr()
+
+    def similarities(self, contents):
+        """
+        Computes the cosine similarity of every content with every tag.
+
+        Args:
+            contents (list): The texts to compare with the tags.
+
+        Returns:
+            numpy.ndarray: One row of tag similarities per content.
+        """
+        post_vectors = self.vectorizer.transform([clean_text(content) for content in contents])
+        return (post_vectors @ self.tag_matrix).toarray()
+
+    def determine_tags(self, posts, min_tags=4, max_tags=6):
+        """
+        Determines the most relevant tags of several posts.
+
+        Args:
+            posts (list): The (heading, tldr) pairs of the posts.
+            min_tags (int): Minimum number of tags to return per post.
+            max_tags (int): Maximum number of tags to return per post.
+
+        Returns:
+            list: A list of relevant tags (between min_tags and max_tags) for every post.
+        """
+        similarities = self.similarities([heading + " " + tldr for heading, tldr in posts])
+        # A stable sort keeps the order of the tags file between equally similar tags
+        rankings = np.argsort(-similarities, axis=1, kind="stable")
+        return [
+            [self.tags[index] for index in ranking[:random.randint(min_tags, max_tags)]]
+            for ranking in rankings
+        ]
+
+
+class SemanticTagIndex:
+    """
+    Embedding index of the available tags, matching posts to tags by meaning.
+
+    Every tag is described in words with its category (e.g. "smart contracts, a
+    Blockchain topic") and embedded once with a local CPU embedding model. The
+    normalized tag embeddings are cached in TAG_EMBEDDINGS_PATH, and recomputed only
+    when the tags or the model change. Posts are embedded and matched by cosine
+    similarity: the tags close to the best match are kept, so the number of tags
+    follows the post instead of a random draw.
+    """
+
+    def __init__(self, tags, embeddings, embeddings_path=TAG_EMBEDDINGS_PATH):
+        # Some tags are listed under several categories, each one is embedded once
+        self.tags = list(dict.fromkeys(tags))
+        self.embeddings = embeddings
+        self.tag_matrix = self._load_tag_matrix(embeddings_path)
+
+    @staticmethod
+    def describe(tag):
+        """Describes a tag in words (e.g. "#smart-contracts" as "smart contracts, a Blockchain topic")."""
+        words = tag.lstrip("#").replace("-", " ")
+        category = tag_categories.get(tag)
+        return f"{words}, a {category} topic" if category else words
+
+    def _embed(self, texts):
+        vectors = np.asarray(self.embeddings.embed_documents(texts), dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.where(norms == 0, 1, norms)
+
+    def _load_tag_matrix(self, path):
+        descriptions = [self.describe(tag) for tag in self.tags]
+        if os.path.exists(path):
+            try:
+                with np.load(path) as cached:
+                    if str(cached["model"]) == self.embeddings.model_name and cached["descriptions"].tolist() == descriptions:
+                        return cached["embeddings"]
+            except Exception as e:
+                # A corrupt or truncated cache is rebuilt below
+                print(f"Ignoring the tag embeddings cache {path}: {e}")
+
+        tag_matrix = self._embed(descriptions)
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        np.savez(path, model=self.embeddings.model_name, descriptions=np.array(descriptions), embeddings=tag_matrix)
+        return tag_matrix
+
+    def similarities(self, contents):
+        """
+        Computes the cosine similarity of every content with every tag.
+
+        Args:
+            contents (list): The texts to compare with the tags.
+
+        Returns:
+            numpy.ndarray: One row of tag similarities per content.
+        """
+        return self._embed(list(contents)) @ self.tag_matrix.T
+
+    def determine_tags(self, posts, min_tags=4, max_tags=6):
+        """
+        Determines the most relevant tags of several posts.
+
+        Args:
+            posts (list): The (heading, tldr) pairs of the posts.
+            min_tags (int): Minimum number of tags to return per post.
+            max_tags (int): Maximum number of tags to return per post.
+
+        Returns:
+            list: The tags within SEMANTIC_TAG_MARGIN of the best match (between min_tags and
+            max_tags), for every post.
+        """
+        similarities = self.similarities([heading + " " + tldr for heading, tldr in posts])
+        rankings = np.argsort(-similarities, axis=1, kind="stable")
+        tags = []
+        for scores, ranking in zip(similarities, rankings):
+            relevant = int(np.count_nonzero(scores >= scores[ranking[0]] - SEMANTIC_TAG_MARGIN))
+            tags.append([self.tags[index] for index in ranking[:min(max(relevant, min_tags), max_tags)]])
+        return tags
+
+
+TAG_ENGINES = ("tfidf", "semantic")
+tag_index_lock = threading.Lock()
+
+
+def load_embedding_model():
+    """
+    Loads the local embedding model of the semantic tag engine, downloading it on first use.
+
+    Raises:
+        ImportError: If langchain_community or fastembed is not installed.
+    """
+    if FastEmbedEmbeddings is None:
+        raise ImportError("langchain_community is required by the semantic tag engine")
+    return FastEmbedEmbeddings()
+
+
+@lru_cache(maxsize=8)
+def build_tag_index(tags, engine):
+    if engine not in TAG_ENGINES:
+        raise ValueError(f"Unknown tag engine {engine!r}, TAG_ENGINE must be one of {', '.join(TAG_ENGINES)}")
+    if engine == "tfidf":
+        return TagIndex(tags)
+
+    try:
+        embeddings = load_embedding_model()
+    except Exception as e:
+        # A missing package or a failed model download must not stop the API from loading, but is not silent
+        print(f"WARNING: TAG_ENGINE is {engine!r} but its embedding model could not be loaded ({e!r}), "
+              f"tags are determined by the tfidf tag engine instead")
+        return TagIndex(tags)
+    return SemanticTagIndex(tags, embeddings)
+
+
+def get_tag_index(tags, engine=TAG_ENGINE):
+    """Returns the tag index of a tuple of tags for an engine, built on first use."""
+    # Tags are determined in worker threads, the lock keeps the index from being built twice
+    with tag_index_lock:
+        return build_tag_index(tags, engine)
+
+
+# The index of resources/tags.json is built once, when the module is loaded
+tag_index = get_tag_index(tuple(all_subcategories))
+
+
 def determine_tags(heading, tldr, all_subcategories, min_tags=4, max_tags=6):
     """
     Determines the most relevant tags for a post based on its heading and TLDR.
@@ -32,39 +215,6 @@ def determine_tags(heading, tldr, all_subcategories, min_tags=4, max_tags=6):
         max_tags (int): Maximum number of tags to return.
     
     Returns:
-        list: A randomly selected list of relevant tags (between min_tags and max_tags).
+        list: A list of the most relevant tags (between min_tags and max_tags).
     """
-    # Combine heading and TLDR for input context
-    post_content = clean_text(heading + " " + tldr)
-
-    # Clean all subcategories
-    cleaned_tags = [clean_text(tag) for tag in all_subcategories]
-
-    # TF-IDF Vectorization
-    tfidf_vectorizer = TfidfVectorizer()
-    vectors = tfidf_vectorizer.fit_transform([post_content] + cleaned_tags)
-    
-    # Compute cosine similarity between the post content and each tag
-    post_vector = vectors[0]  # The vector for the input post
-    tag_vectors = vectors[1:]  # The vectors for the tags
-    similarities = cosine_similarity(post_vector, tag_vectors).flatten()
-
-    # Rank tags by similarity score
-    tag_scores = list(zip(all_subcategories, similarities))
-    sorted_tags = sorted(tag_scores, key=lambda x: x[1], reverse=True)
-
-    # Select relevant tags with similarity above 0.1
-    relevant_tags = [tag for tag, score in sorted_tags if score > 0.1]
-
-    # Randomly select the number of tags to return within the range [min_tags, max_tags]
-    num_tags_to_return = random.randint(min_tags, max_tags)
-
-    # Ensure the number of tags to return does not exceed available relevant tags
-    selected_tags = relevant_tags[:num_tags_to_return]
-
-    # If there aren't enough relevant tags, pad with lower-ranked tags
-    if len(selected_tags) < num_tags_to_return:
-        remaining_tags = [tag for tag, _ in sorted_tags if tag not in selected_tags]
-        selected_tags += remaining_tags[:num_tags_to_return - len(selected_tags)]
-
-    return selected_tags
\ No newline at end of file
+    return get_tag_index(tuple(all_subcategories)).determine_tags([(heading, tldr)], min_tags, max_tags)[0]
@@ -0,0 +1,83 @@
+import base64
+from datetime import datetime
+from pymongo import ASCENDING
+from handlers.config import comments_collection
+
+COMMENT_PROJECTION = {
+    "_id": 0,
+    "comment_id": 1,
+    "user_id": 1,
+    "username": 1,
+    "pfp": 1,
+    "text": 1,
+    "likes": 1,
+    "dislikes": 1,
+    "created_on": 1,
+}
+
+
+def encode_comment_cursor(comment: dict) -> str:
+    """Encodes the position of the last returned comment into an opaque continuation cursor."""
+    position = f"{comment['created_on'].isoformat()}|{comment['comment_id']}"
+    return base64.urlsafe_b64encode(position.encode()).decode()
+
+
+def decode_comment_cursor(cursor: str):
+    """
+    Decodes a comment continuation cursor.
+
+    Args:
+        cursor (str): The cursor returned by a previous page.
+
+    Returns:
+        tuple: The creation time and the ID of the last comment of the previous page.
+
+    Raises:
+        ValueError: If the cursor is malformed.
+    """
+    try:
+        created_on, comment_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(created_on), comment_id
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+async def fetch_comments_page(post_id: str, page_size: int, cursor: str = None):
+    """
+    Fetches one page of the comments of a post, oldest first.
+
+    Pages are keyed on (created_on, comment_id) instead of an offset, so every page is
+    a bounded range scan of the (post_id, created_on) index.
+
+    Args:
+        post_id (str): ID of the post to fetch the comments of.
+        page_size (int): Number of comments to return.
+        cursor (str): Cursor returned by the previous page, None for the first page.
+
+    Returns:
+        tuple: The comments of the page and the cursor of the next page (None on the last page).
+
+    Raises:
+        ValueError: If the cursor is malformed.
+    """
+    query = {"post_id": post_id}
+    if cursor:
+        created_on, comment_id = decode_comment_cursor(cursor)
+        query["$or"] = [
+            {"created_on": {"$gt": created_on}},
+            {"created_on": created_on, "comment_id": {"$gt": comment_id}},
+        ]
+
+    # Fetch one extra comment to know whether there is a next page
+    comments = await comments_collection.find(query, COMMENT_PROJECTION).sort(
+        [("created_on", ASCENDING), ("comment_id", ASCENDING)]
+    ).to_list(length=page_size + 1)
+
+    next_cursor = None
+    if len(comments) > page_size:
+        comments = comments[:page_size]
+        next_cursor = encode_comment_cursor(comments[-1])
+
+    for comment in comments:
+        comment["created_on"] = comment["created_on"].isoformat()
+    return comments, next_cursor
@@ -28,10 +28,25 @@ community_collection = db["community"]
 reports_collection = db["reports"]
 read_posts_collection = db["read_posts"]
 banned_collection = db["banned"]
+feeds_collection = db["feeds"]
+recommendation_snapshots_collection = db["recommendation_snapshots"]
+post_reactions_collection = db["post_reactions"]
+comments_collection = db["comments"]
+comment_reactions_collection = db["comment_reactions"]
+read_history_collection = db["read_history"]
+enrichment_jobs_collection = db["enrichment_jobs"]
+generation_cache_collection = db["generation_cache"]
+spam_examples_collection = db["spam_examples"]
 
 # AI model variables
 
-MODEL_TO_USE = str(os.environ.get('MODEL_TO_USE'))
+MODEL_TO_USE = str(os.environ.get('MODEL_TO_USE', 'llava:7b'))
+# Maximum number of generations sent to Ollama at the same time
+LLM_MAX_CONCURRENCY = int(os.environ.get('LLM_MAX_CONCURRENCY', 2))
+# Seconds a single generation may take before it is cancelled
+LLM_TIMEOUT = float(os.environ.get('LLM_TIMEOUT', 120))
+# Context window of the model in tokens, batched generations are sized to fit in it
+LLM_CONTEXT_TOKENS = int(os.environ.get('LLM_CONTEXT_TOKENS', 4096))
 
 # Email Variables
 MAIL_USERNAME = str(os.environ.get('MAIL_USERNAME'))
@@ -105,3 +120,30 @@ all_subcategories = [
     for category in data["categories"]  # Iterate through the list of categories
     for subcategory in category["subcategories"]
 ]
+
+# Category name of every tag
+tag_categories = {
+    subcategory: category["category_name"]
+    for category in data["categories"]
+    for subcategory in category["subcategories"]
+}
+
+# Engine matching posts to tags ("tfidf" or "semantic")
+TAG_ENGINE = str(os.environ.get('TAG_ENGINE', 'tfidf')).lower()
+# File caching the tag embeddings of the semantic tag engine
+TAG_EMBEDDINGS_PATH = str(os.environ.get('TAG_EMBEDDINGS_PATH', os.path.join("resources", "tag_embeddings.npz")))
+
+# Ranking engine used by the recommendation algorithm ("python" or "numpy")
+RANKING_ENGINE = str(os.environ.get('RANKING_ENGINE', 'python')).lower()
+# Candidate retrieval mode of the recommendation algorithm ("find" or "aggregate")
+RECOMMENDATION_RETRIEVAL = str(os.environ.get('RECOMMENDATION_RETRIEVAL', 'find')).lower()
+# Seconds a single candidate source may take before the recommendation continues without it
+RECOMMENDATION_SOURCE_TIMEOUT = float(os.environ.get('RECOMMENDATION_SOURCE_TIMEOUT', 2))
+
+# Seconds between two flushes of the buffered post view counts
+VIEW_FLUSH_INTERVAL = float(os.environ.get('VIEW_FLUSH_INTERVAL', 5))
+# Number of distinct buffered posts that triggers an early flush
+VIEW_FLUSH_THRESHOLD = int(os.environ.get('VIEW_FLUSH_THRESHOLD', 500))
+
+# Number of background workers generating the TLDR and tags of new posts
+ENRICHMENT_WORKERS = int(os.environ.get('ENRICHMENT_WORKERS', 2))
@@ -3,14 +3,14 @@ from typing import List
 from uuid import uuid4
 import re
 from handlers.config import posts_collection, images_collection
-from better_profanity import profanity
-from generators.spam_model import classify
-
-profanity.load_censor_words()
+from handlers.moderation import moderation
+from generators.spam_model import classify_batch
+from algorithm.feed import update_feeds_for_post
 
 def validate_tags(tags: List[str]):
-    for tag in tags:
-        if profanity.contains_profanity(tag):
+    # All the tags are checked in one pass
+    for tag, (_, hits) in zip(tags, moderation.censor_batch(tags)):
+        if hits:
             raise ValueError(f"Tag '{tag}' contains inappropriate language and is not allowed.")
 
 async def create_post_without_token(user_name: str, user_pfp: str, heading: str, tldr: str, image: str, tags: List[str], post_link: str):
@@ -50,20 +50,11 @@ async def create_post_without_token(user_name: str, user_pfp: str, heading: str,
     if not url_regex.match(post_link):
         raise ValueError("Invalid URL format for the post link")
     
-    censored_heading = profanity.censor(heading)
-    censored_tags = [profanity.censor(tag) for tag in tags]
-
-    def count_censored_words(original_text, censored_text):
-        original_words = original_text.split()
-        censored_words = censored_text.split()
-        return sum(1 for o, c in zip(original_words, censored_words) if o != c)
+    # The heading and every tag are censored in one pass
+    censored_word_count = sum(hits for _, hits in moderation.censor_batch([heading] + tags))
 
-    censored_word_count = count_censored_words(heading, censored_heading)
-    censored_word_count += sum(
-        count_censored_words(tag, censored_tag) for tag, censored_tag in zip(tags, censored_tags)
-    )
-
-    if classify(heading) or any(classify(tag) for tag in tags):
+    # The heading and every tag are classified in one batch
+    if any(classify_batch([heading] + tags)):
         raise ValueError("The post content is flagged as spam")
 
     if censored_word_count > 6:
@@ -102,13 +93,19 @@ async def create_post_without_token(user_name: str, user_pfp: str, heading: str,
         "tags": tags,
         "post_link": post_link,
         "created_on": datetime.now(timezone.utc),
-        "likes": {"count": 0, "users": []},
-        "dislikes": {"count": 0, "users": []},
+        "likes": {"count": 0},
+        "dislikes": {"count": 0},
         "views": 0,
-        "comments": []
+        "comment_count": 0
     }
 
     # Insert post into the database
     await posts_collection.insert_one(post_document)
 
+    # Rank the post into the materialized feeds, as the fetchers run without the API's feed materializer
+    try:
+        await update_feeds_for_post(post_document["post_id"])
+    except Exception as e:
+        print(f"Error updating feeds for post {post_document['post_id']}: {e}")
+
     return {"success": True, "message": "Post created successfully", "post_id": post_document["post_id"]}
\ No newline at end of file
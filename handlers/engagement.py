@@ -0,0 +1,185 @@
+import asyncio
+from datetime import datetime, timedelta
+from bson import ObjectId
+from pymongo import UpdateOne, ReturnDocument
+from handlers.config import user_collection
+from handlers.read_history import read_history
+
+ENGAGEMENT_BATCH_SIZE = 200  # Maximum number of events applied per batch
+STREAK_WINDOW = timedelta(days=1)  # A streak is reset once a user goes this long without reading
+LUMENS_EVERY_POSTS = 25  # A lumens point is earned for every 25 posts read
+
+
+def streak_update(read_on: datetime, new_post: bool, first_post: bool):
+    """
+    Builds the pipeline update applying the streak and lumens rules of one post read.
+
+    Args:
+        read_on (datetime): When the post was read.
+        new_post (bool): Whether the user had not read the post before.
+        first_post (bool): Whether it is the first post the user reads that day.
+
+    Returns:
+        list: The update pipeline.
+    """
+    reset = {"$gt": [
+        {"$subtract": [read_on, {"$ifNull": ["$last_streak_update", read_on]}]},
+        STREAK_WINDOW.total_seconds() * 1000
+    ]}
+    return [
+        {"$set": {
+            "streak": {"$add": [
+                {"$cond": [reset, 0, {"$ifNull": ["$streak", 0]}]},
+                1 if new_post and first_post else 0
+            ]},
+            "posts_read_count": {"$add": [
+                {"$cond": [reset, 0, {"$ifNull": ["$posts_read_count", 0]}]},
+                1 if new_post else 0
+            ]},
+        }},
+        {"$set": {
+            "lumens": {"$add": [
+                {"$ifNull": ["$lumens", 1]},
+                {"$cond": [{"$eq": [{"$mod": ["$posts_read_count", LUMENS_EVERY_POSTS]}, 0]}, 1, 0]}
+            ]},
+            "last_streak_update": read_on,
+        }},
+    ]
+
+
+class EngagementEngine:
+    """
+    Background worker applying the streak, lumens and read-tracking rules.
+
+    Post reads are queued by `/post/get` and applied in batches: the reads are recorded
+    in the read history, and the streak/lumens rules are applied with pipeline updates
+    (no read-modify-write), so reads of several posts in parallel can no longer
+    overwrite each other. Streak restores go through the same queue, so
+    they are applied in order with the reads of the user.
+    """
+
+    def __init__(self, batch_size: int = ENGAGEMENT_BATCH_SIZE):
+        self.batch_size = batch_size
+        self.queue = None
+        self.task = None
+        self.processed_events = 0
+        self.failed_events = 0
+
+    def start(self):
+        """Starts the worker on the running event loop."""
+        self.queue = asyncio.Queue()
+        self.task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Applies the queued events and stops the worker."""
+        if self.task:
+            await self.queue.join()
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+
+    def record_read(self, user_id: str, post_id: str):
+        """Queues a post read of a user."""
+        if self.queue is not None:
+            self.queue.put_nowait(("read", user_id, post_id, datetime.utcnow(), None))
+
+    async def restore_streak(self, user_id: str):
+        """
+        Restores the reset streak of a user in exchange for one lumens point.
+
+        Args:
+            user_id (str): ID of the user.
+
+        Returns:
+            dict: The streak and remaining lumens of the user, or None if the streak was not
+            restored (no reset streak, or not enough lumens).
+        """
+        future = asyncio.get_running_loop().create_future()
+        self.queue.put_nowait(("restore", user_id, None, datetime.utcnow(), future))
+        return await future
+
+    def get_metrics(self):
+        """Returns the queue length and processed event counters."""
+        return {
+            "queued_events": self.queue.qsize() if self.queue else 0,
+            "processed_events": self.processed_events,
+            "failed_events": self.failed_events,
+        }
+
+    async def _run(self):
+        while True:
+            batch = [await self.queue.get()]
+            while len(batch) < self.batch_size and not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+            try:
+                await self._apply(batch)
+            except Exception as e:
+                self.failed_events += len(batch)
+                print(f"Error applying engagement events: {e}")
+                for *_, future in batch:
+                    if future and not future.done():
+                        future.set_exception(e)
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+
+    async def _apply(self, batch):
+        reads = []
+        for event in batch:
+            kind, user_id, _, event_time, future = event
+            if kind == "read":
+                reads.append(event)
+                continue
+
+            # Reads queued before the restore are applied first
+            await self._apply_reads(reads)
+            reads = []
+            future.set_result(await self._restore(user_id, event_time))
+            self.processed_events += 1
+        await self._apply_reads(reads)
+
+    async def _apply_reads(self, reads):
+        if not reads:
+            return
+
+        # Reads of the same user are recorded in order, reads of different users concurrently
+        reads_by_user = {}
+        for event in reads:
+            reads_by_user.setdefault(event[1], []).append(event)
+        recorded = await asyncio.gather(*(self._record_reads(events) for events in reads_by_user.values()))
+
+        updates = []
+        for events in recorded:
+            for (_, user_id, _, read_on, _), (new_post, first_post) in events:
+                updates.append(UpdateOne({"_id": ObjectId(user_id)}, streak_update(read_on, new_post, first_post)))
+        await user_collection.bulk_write(updates, ordered=True)
+        self.processed_events += len(updates)
+
+    async def _record_reads(self, events):
+        recorded = []
+        for event in events:
+            _, user_id, post_id, read_on, _ = event
+            recorded.append((event, await read_history.record(user_id, post_id, read_on)))
+        return recorded
+
+    async def _restore(self, user_id: str, restored_on: datetime):
+        # Only a reset streak (more than a day without reading) can be restored, for one lumens point
+        return await user_collection.find_one_and_update(
+            {
+                "_id": ObjectId(user_id),
+                "last_streak_update": {"$lt": restored_on - STREAK_WINDOW},
+                "$expr": {"$gt": [{"$ifNull": ["$lumens", 1]}, 0]},
+            },
+            [{"$set": {
+                "last_streak_update": restored_on,
+                "lumens": {"$subtract": [{"$ifNull": ["$lumens", 1]}, 1]},
+            }}],
+            projection={"_id": 0, "streak": 1, "lumens": 1},
+            return_document=ReturnDocument.AFTER
+        )
+
+
+engagement_engine = EngagementEngine()
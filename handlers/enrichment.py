@@ -0,0 +1,170 @@
+import asyncio
+from datetime import datetime, timedelta
+from pymongo import ASCENDING, ReturnDocument
+from handlers.config import posts_collection, enrichment_jobs_collection, all_subcategories, ENRICHMENT_WORKERS
+from generators.gen_post_info import process_post, get_cached_tldr
+from generators.tagsystem import determine_tags
+from algorithm.feed import feed_materializer
+
+ENRICHMENT_MAX_ATTEMPTS = 5  # A job is marked as failed after this many attempts
+ENRICHMENT_BACKOFF_SECONDS = 10  # Delay before the first retry, doubled after every failed attempt
+ENRICHMENT_POLL_SECONDS = 5  # Idle workers look for due retries at this interval
+ENRICHMENT_LEASE_SECONDS = 15 * 60  # A running job not finished after this long is considered abandoned by its worker
+
+
+class EnrichmentQueue:
+    """
+    Persistent job queue generating the TLDR and tags of user posts in the background.
+
+    Posts are inserted right away with their enrichment status set to "pending", and a
+    job is stored in enrichment_jobs_collection. A pool of worker tasks claims due jobs
+    atomically, runs the LLM and the tag system, and patches the post. Failed jobs are
+    retried with exponential backoff. A claimed job is leased to its worker for
+    ENRICHMENT_LEASE_SECONDS: a job still running after that (its worker was stopped or
+    crashed) is claimed again by any worker, while the jobs of live workers in other
+    processes are left alone.
+    """
+
+    def __init__(self, workers: int = ENRICHMENT_WORKERS):
+        self.workers = workers
+        self.tasks = []
+        self.wakeup = None
+        self.completed_jobs = 0
+        self.failed_attempts = 0
+
+    async def start(self):
+        """Starts the workers on the running event loop."""
+        self.wakeup = asyncio.Event()
+        self.tasks = [asyncio.create_task(self._run()) for _ in range(self.workers)]
+
+    async def stop(self):
+        """Stops the workers. Jobs they were running are claimed again once their lease expires."""
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks = []
+
+    async def enqueue(self, post_id: str):
+        """
+        Queues (or requeues) the enrichment of a post.
+
+        Args:
+            post_id (str): ID of the post to enrich.
+        """
+        now = datetime.utcnow()
+        await enrichment_jobs_collection.update_one(
+            {"post_id": post_id},
+            {
+                "$set": {"status": "queued", "attempts": 0, "next_attempt_on": now, "error": None, "updated_on": now},
+                "$setOnInsert": {"created_on": now},
+            },
+            upsert=True
+        )
+        if self.wakeup:
+            self.wakeup.set()
+
+    async def get_status(self, post_id: str):
+        """
+        Returns the enrichment job of a post.
+
+        Args:
+            post_id (str): ID of the post.
+
+        Returns:
+            dict: The status, attempts and last error of the job, or None if the post has no job.
+        """
+        return await enrichment_jobs_collection.find_one(
+            {"post_id": post_id}, {"_id": 0, "status": 1, "attempts": 1, "error": 1}
+        )
+
+    def get_metrics(self):
+        """Returns the worker count and job counters of this process."""
+        return {
+            "workers": len(self.tasks),
+            "completed_jobs": self.completed_jobs,
+            "failed_attempts": self.failed_attempts,
+        }
+
+    async def _claim(self):
+        now = datetime.utcnow()
+        return await enrichment_jobs_collection.find_one_and_update(
+            {"$or": [
+                {"status": "queued", "next_attempt_on": {"$lte": now}},
+                {"status": "running", "updated_on": {"$lt": now - timedelta(seconds=ENRICHMENT_LEASE_SECONDS)}},
+            ]},
+            {"$set": {"status": "running", "updated_on": now}, "$inc": {"attempts": 1}},
+            sort=[("next_attempt_on", ASCENDING)],
+            return_document=ReturnDocument.AFTER
+        )
+
+    async def _run(self):
+        while True:
+            try:
+                job = await self._claim()
+            except Exception as e:
+                print(f"Error claiming enrichment job: {e}")
+                job = None
+
+            if job is None:
+                # Sleep until a new job is queued or a retry becomes due
+                try:
+                    await asyncio.wait_for(self.wakeup.wait(), timeout=ENRICHMENT_POLL_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+                self.wakeup.clear()
+                continue
+
+            try:
+                await self._process(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                await self._fail(job, e)
+
+    async def _process(self, job: dict):
+        post = await posts_collection.find_one({"post_id": job["post_id"]}, {"heading": 1, "description": 1})
+        if not post:
+            # The post was deleted while its job was waiting
+            await enrichment_jobs_collection.delete_one({"_id": job["_id"]})
+            return
+
+        # A TLDR streamed by /post/tldr/stream before the post was created is reused
+        tldr = await get_cached_tldr(post["heading"], post["description"])
+        if not tldr:
+            tldr_data = await process_post(post["heading"], post["description"])
+            if "error" in tldr_data or not tldr_data.get("tldr"):
+                raise ValueError(tldr_data.get("error", "No TLDR generated"))
+            tldr = tldr_data["tldr"]
+        # The tag system is CPU bound, keep it off the event loop
+        tags = await asyncio.to_thread(determine_tags, post["heading"], tldr, all_subcategories)
+
+        await posts_collection.update_one(
+            {"post_id": job["post_id"]},
+            {"$set": {"tldr": tldr, "tags": tags, "enrichment": "done"}}
+        )
+        # A job requeued by an edit, or claimed again after its lease expired, is left to its new run
+        await enrichment_jobs_collection.update_one(
+            {"_id": job["_id"], "status": "running", "attempts": job["attempts"]},
+            {"$set": {"status": "done", "error": None, "updated_on": datetime.utcnow()}}
+        )
+        self.completed_jobs += 1
+        feed_materializer.notify_post(job["post_id"])
+
+    async def _fail(self, job: dict, error: Exception):
+        self.failed_attempts += 1
+        print(f"Error enriching post {job['post_id']} (attempt {job['attempts']}): {error}")
+        now = datetime.utcnow()
+
+        if job["attempts"] >= ENRICHMENT_MAX_ATTEMPTS:
+            update = {"status": "failed", "error": str(error), "updated_on": now}
+        else:
+            delay = timedelta(seconds=ENRICHMENT_BACKOFF_SECONDS * 2 ** (job["attempts"] - 1))
+            update = {"status": "queued", "next_attempt_on": now + delay, "error": str(error), "updated_on": now}
+        result = await enrichment_jobs_collection.update_one(
+            {"_id": job["_id"], "status": "running", "attempts": job["attempts"]}, {"$set": update}
+        )
+        if result.modified_count and update["status"] == "failed":
+            await posts_collection.update_one({"post_id": job["post_id"]}, {"$set": {"enrichment": "failed"}})
+
+
+enrichment_queue = EnrichmentQueue()
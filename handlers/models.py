@@ -1,8 +1,84 @@
-from pymongo import IndexModel, ASCENDING
-from handlers.config import user_collection
-
-# Create indexes for email and username
-user_collection.create_indexes([
-    IndexModel([("email", ASCENDING)], unique=True),
-    IndexModel([("username", ASCENDING)], unique=True),
-])
\ No newline at end of file
+from pymongo import IndexModel, ASCENDING, DESCENDING
+from pymongo.errors import OperationFailure
+from handlers.config import user_collection, feeds_collection, recommendation_snapshots_collection, post_reactions_collection, comments_collection, comment_reactions_collection, read_history_collection, enrichment_jobs_collection, generation_cache_collection, spam_examples_collection
+from algorithm.feed import FEED_TTL_SECONDS
+from algorithm.snapshots import SNAPSHOT_TTL_SECONDS
+from handlers.read_history import READ_HISTORY_TTL_SECONDS
+from generators.generation_cache import GENERATION_CACHE_TTL_SECONDS
+
+
+async def create_indexes():
+    """Creates the indexes used by the API. Called once on application startup."""
+    # Create indexes for email and username
+    await user_collection.create_indexes([
+        IndexModel([("email", ASCENDING)], unique=True),
+        IndexModel([("username", ASCENDING)], unique=True),
+    ])
+
+    # Materialized feeds are looked up per user and expire once the user stops reading them
+    await feeds_collection.create_indexes([
+        IndexModel([("user_id", ASCENDING)], unique=True),
+        IndexModel([("interests", ASCENDING)]),
+        IndexModel([("following", ASCENDING)]),
+        IndexModel([("posts.post_id", ASCENDING)]),
+        IndexModel([("last_read_on", DESCENDING)], expireAfterSeconds=FEED_TTL_SECONDS),
+    ])
+
+    # Ranking snapshots back the recommendation cursors, one per user, and expire shortly after they are created
+    snapshot_indexes = [
+        IndexModel([("user_id", ASCENDING)], unique=True),
+        IndexModel([("snapshot_id", ASCENDING)], unique=True),
+        IndexModel([("created_on", ASCENDING)], expireAfterSeconds=SNAPSHOT_TTL_SECONDS),
+    ]
+    try:
+        await recommendation_snapshots_collection.create_indexes(snapshot_indexes)
+    except OperationFailure:
+        # Snapshots from before the one-per-user layout can hold several per user, they expire
+        # within minutes anyway, so they are dropped for the unique index to be built
+        await recommendation_snapshots_collection.delete_many({})
+        await recommendation_snapshots_collection.create_indexes(snapshot_indexes)
+
+    # One like or dislike per user and post, looked up by post and by user
+    await post_reactions_collection.create_indexes([
+        IndexModel([("post_id", ASCENDING), ("user_id", ASCENDING)], unique=True),
+        IndexModel([("user_id", ASCENDING)]),
+    ])
+
+    # Comments are paged per post in creation order and addressed by their ID
+    await comments_collection.create_indexes([
+        IndexModel([("post_id", ASCENDING), ("created_on", ASCENDING), ("comment_id", ASCENDING)]),
+        IndexModel([("comment_id", ASCENDING)], unique=True),
+        IndexModel([("post_id", ASCENDING), ("user_id", ASCENDING)]),
+    ])
+
+    # One like or dislike per user and comment
+    await comment_reactions_collection.create_indexes([
+        IndexModel([("comment_id", ASCENDING), ("user_id", ASCENDING)], unique=True),
+    ])
+
+    # One read history entry per user and post, expiring after the user stops reading the post
+    await read_history_collection.create_indexes([
+        IndexModel([("user_id", ASCENDING), ("post_id", ASCENDING)], unique=True),
+        IndexModel([("user_id", ASCENDING), ("first_read_on", DESCENDING)]),
+        IndexModel([("read_on", ASCENDING)], expireAfterSeconds=READ_HISTORY_TTL_SECONDS),
+    ])
+
+    # Enrichment jobs are claimed by status and due time (or expired lease), one job per post
+    await enrichment_jobs_collection.create_indexes([
+        IndexModel([("post_id", ASCENDING)], unique=True),
+        IndexModel([("status", ASCENDING), ("next_attempt_on", ASCENDING)]),
+        IndexModel([("status", ASCENDING), ("updated_on", ASCENDING)]),
+    ])
+
+    # Cached LLM generations are looked up by content hash and purged by prompt version
+    await generation_cache_collection.create_indexes([
+        IndexModel([("key", ASCENDING)], unique=True),
+        IndexModel([("kind", ASCENDING), ("prompt_version", ASCENDING)]),
+        IndexModel([("created_on", ASCENDING)], expireAfterSeconds=GENERATION_CACHE_TTL_SECONDS),
+    ])
+
+    # One spam example per confirmed post or comment, streamed by confirmation time by the trainer
+    await spam_examples_collection.create_indexes([
+        IndexModel([("target_id", ASCENDING)], unique=True),
+        IndexModel([("created_on", ASCENDING)]),
+    ])
@@ -0,0 +1,131 @@
+import re
+from bisect import bisect_right
+from better_profanity import profanity
+from better_profanity.constants import ALLOWED_CHARACTERS
+from better_profanity.utils import get_complete_path_of_file, read_wordlist
+
+BATCH_SEPARATOR = "\x00"  # Separates the texts of a batch, never part of a word or of a separator run
+CENSOR_LENGTH = 4  # A censored word is replaced by this many censor characters, like better_profanity
+
+
+def character_class(chars):
+    """Builds the body of a regex character class matching the given characters, as ranges."""
+    codes = sorted(ord(char) for char in chars)
+    ranges = []
+    for code in codes:
+        if ranges and code == ranges[-1][1] + 1:
+            ranges[-1][1] = code
+        else:
+            ranges.append([code, code])
+    return "".join(
+        re.escape(chr(start)) if start == end else f"{re.escape(chr(start))}-{re.escape(chr(end))}"
+        for start, end in ranges
+    )
+
+
+class ModerationEngine:
+    """
+    Profanity matcher compiled once from the better_profanity word list.
+
+    The words are merged into a prefix tree and compiled into a single regex, where
+    every character accepts its better_profanity substitutes (e.g. "a" also matches
+    "@", "4" and "*") and the characters of a word may be split into several words by
+    separators ("f u c k"). Matches are aligned on the same word boundaries as
+    better_profanity, so a text is censored and its hits counted in one pass of the
+    regex instead of one comparison with every word of the list per word of the text.
+
+    A few spellings better_profanity lets through are censored, and count toward the
+    "more than 6 inappropriate words" limits of posts and comments: words spelled out
+    across separators at the end of a text ("you f u c k", which better_profanity only
+    catches when another word follows) or across more than 5 words, and listed words
+    containing punctuation ("sh!+"). Each censored word or phrase counts as one hit.
+    `python -m benchmarks.moderation` prints the differences on a sample corpus.
+    """
+
+    def __init__(self, words=None, char_map=None):
+        words = words or read_wordlist(get_complete_path_of_file("profanity_wordlist.txt"))
+        self.char_map = char_map or profanity.CHARS_MAPPING
+        allowed = character_class(ALLOWED_CHARACTERS)
+        # Runs of whitespace and punctuation between the letters of a word, kept short as it appears at
+        # every letter of the pattern (the exact word boundaries are checked around the whole match)
+        self.separator = f"(?:[^\\w@$*\"'{BATCH_SEPARATOR}]|_)+"
+
+        trie = {}
+        for word in {word.lower() for word in words}:
+            node = trie
+            for char in word:
+                node = node.setdefault(char, {})
+            node[""] = {}
+
+        self.pattern = re.compile(
+            f"(?<![{allowed}]){self._trie_pattern(trie, False)}(?![{allowed}])",
+            re.IGNORECASE
+        )
+
+    def _char_pattern(self, char):
+        variants = self.char_map.get(char, (char,))
+        if all(len(variant) == 1 for variant in variants):
+            return f"[{''.join(re.escape(variant) for variant in variants)}]" if len(variants) > 1 else re.escape(char)
+        return f"(?:{'|'.join(re.escape(variant) for variant in variants)})"
+
+    def _trie_pattern(self, node, previous_allowed):
+        branches = []
+        for char in sorted(char for char in node if char):
+            allowed = char in ALLOWED_CHARACTERS
+            # Two letters of a word may be written as two words ("bull shit")
+            gap = f"(?:{self.separator})?" if previous_allowed and allowed else ""
+            branches.append(gap + self._char_pattern(char) + self._trie_pattern(node[char], allowed))
+        if "" in node:
+            # The end of a word is tried last, so the longest word is censored
+            branches.append("")
+        return branches[0] if len(branches) == 1 else f"(?:{'|'.join(branches)})"
+
+    def censor(self, text, censor_char="*"):
+        """
+        Censors the profanity of a text.
+
+        Args:
+            text (str): The text to censor.
+            censor_char (str): Character replacing the censored words.
+
+        Returns:
+            tuple: The censored text, and the number of censored words.
+        """
+        replacement = censor_char * CENSOR_LENGTH
+        return self.pattern.subn(lambda match: replacement, text)
+
+    def censor_batch(self, texts, censor_char="*"):
+        """
+        Censors the profanity of several texts (e.g. the tags of a post) in one pass.
+
+        Args:
+            texts (list): The texts to censor.
+            censor_char (str): Character replacing the censored words.
+
+        Returns:
+            list: The censored text and its number of censored words, for every text.
+        """
+        if any(BATCH_SEPARATOR in text for text in texts):
+            return [self.censor(text, censor_char) for text in texts]
+
+        offsets, position = [], 0
+        for text in texts:
+            offsets.append(position)
+            position += len(text) + len(BATCH_SEPARATOR)
+
+        replacement = censor_char * CENSOR_LENGTH
+        hits = [0] * len(texts)
+
+        def replace(match):
+            hits[bisect_right(offsets, match.start()) - 1] += 1
+            return replacement
+
+        censored = self.pattern.sub(replace, BATCH_SEPARATOR.join(texts)).split(BATCH_SEPARATOR)
+        return list(zip(censored, hits))
+
+    def contains_profanity(self, text):
+        """Returns whether a text contains profanity."""
+        return self.pattern.search(text) is not None
+
+
+moderation = ModerationEngine()
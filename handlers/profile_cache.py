@@ -0,0 +1,69 @@
+import time
+from collections import OrderedDict
+from bson import ObjectId
+from handlers.config import user_collection
+
+AUTHOR_CACHE_TTL_SECONDS = 5 * 60  # Author profiles are refreshed at least every 5 minutes
+AUTHOR_CACHE_SIZE = 10000  # Maximum number of cached author profiles
+
+
+class AuthorProfileCache:
+    """
+    In-process LRU cache of the (username, profile picture URL) of post authors.
+
+    A popular author is read by every viewer of their posts, so their profile is
+    fetched once per TTL instead of once per post read.
+    """
+
+    def __init__(self, ttl: float = AUTHOR_CACHE_TTL_SECONDS, size: int = AUTHOR_CACHE_SIZE):
+        self.ttl = ttl
+        self.size = size
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    async def get(self, user_id: str):
+        """
+        Resolves the profile of a post author.
+
+        Args:
+            user_id (str): ID of the author.
+
+        Returns:
+            tuple: The username ("Unknown" if the author does not exist) and the profile picture URL (or None).
+        """
+        entry = self.entries.get(user_id)
+        if entry and entry[0] > time.monotonic():
+            self.entries.move_to_end(user_id)
+            self.hits += 1
+            return entry[1]
+
+        self.misses += 1
+        try:
+            user_info = await user_collection.find_one(
+                {"_id": ObjectId(user_id)}, {"username": 1, "profile_picture.url": 1}
+            )
+        except Exception:
+            return "Unknown", None  # Not cached, the lookup is retried on the next read
+
+        if user_info:
+            profile = (user_info.get("username", "Unknown"), user_info.get("profile_picture", {}).get("url", None))
+        else:
+            profile = ("Unknown", None)
+
+        self.entries[user_id] = (time.monotonic() + self.ttl, profile)
+        self.entries.move_to_end(user_id)
+        if len(self.entries) > self.size:
+            self.entries.popitem(last=False)
+        return profile
+
+    def invalidate(self, user_id: str):
+        """Drops the cached profile of a user (e.g. after their account is deleted)."""
+        self.entries.pop(user_id, None)
+
+    def get_metrics(self):
+        """Returns the cache size and hit/miss counters."""
+        return {"size": len(self.entries), "hits": self.hits, "misses": self.misses}
+
+
+author_profiles = AuthorProfileCache()
@@ -0,0 +1,82 @@
+import asyncio
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+COUNTER_FIELDS = {"like": "likes.count", "dislike": "dislikes.count"}
+
+
+async def toggle_reaction(reactions_collection, targets_collection, target_query: dict, id_field: str, user_id: str, reaction_type: str):
+    """
+    Toggles a user's like or dislike on a post or a comment and adjusts its counters.
+
+    The reaction document of the user is flipped by a single atomic pipeline update, and the
+    counters are then moved by the exact transition that update observed. Concurrent clicks
+    are therefore serialized on the reaction document and can never skew the counters. When
+    two first reactions race on the upsert, the loser hits the unique index and is retried
+    once as an update of the document the winner inserted.
+
+    Args:
+        reactions_collection: Collection holding one reaction document per user and target.
+        targets_collection: Collection holding the reacted post or comment and its counters.
+        target_query (dict): Query matching the target (e.g. its post_id and community_id).
+        id_field (str): Field of target_query holding the target ID (e.g. "post_id").
+        user_id (str): ID of the reacting user.
+        reaction_type (str): "like" or "dislike".
+
+    Returns:
+        dict: The new likes and dislikes counts and the user's reaction (None once removed),
+        or None if the target does not exist.
+    """
+    reaction_query = {id_field: target_query[id_field], "user_id": user_id}
+
+    # Set the reaction, or clear it if the user already had this reaction
+    flip_reaction = [{"$set": {
+        "type": {"$cond": [{"$eq": ["$type", reaction_type]}, None, reaction_type]},
+        "created_on": "$$NOW",
+    }}]
+    try:
+        previous = await reactions_collection.find_one_and_update(
+            reaction_query, flip_reaction, projection={"type": 1}, upsert=True, return_document=ReturnDocument.BEFORE
+        )
+    except DuplicateKeyError:
+        # A concurrent first reaction inserted the document first, flip the one it inserted
+        previous = await reactions_collection.find_one_and_update(
+            reaction_query, flip_reaction, projection={"type": 1}, upsert=True, return_document=ReturnDocument.BEFORE
+        )
+    previous_type = previous.get("type") if previous else None
+    new_type = None if previous_type == reaction_type else reaction_type
+
+    increments = {}
+    if previous_type:
+        increments[COUNTER_FIELDS[previous_type]] = -1
+    if new_type:
+        increments[COUNTER_FIELDS[new_type]] = 1
+
+    update_counters = targets_collection.find_one_and_update(
+        target_query,
+        {"$inc": increments},
+        projection={"_id": 0, "likes.count": 1, "dislikes.count": 1},
+        return_document=ReturnDocument.AFTER
+    )
+    if new_type:
+        target = await update_counters
+    else:
+        # Drop the cleared reaction unless a concurrent click already set it again
+        target, _ = await asyncio.gather(
+            update_counters,
+            reactions_collection.delete_one({**reaction_query, "type": None})
+        )
+
+    if not target:
+        # The target does not exist, undo the reaction
+        if previous_type:
+            await reactions_collection.update_one(reaction_query, {"$set": {"type": previous_type}}, upsert=True)
+        else:
+            await reactions_collection.delete_one(reaction_query)
+        return None
+
+    return {
+        "likes": target["likes"]["count"],
+        "dislikes": target["dislikes"]["count"],
+        "reaction": new_type,
+    }
@@ -0,0 +1,153 @@
+import asyncio
+import hashlib
+import math
+import time
+from collections import OrderedDict
+from datetime import datetime
+from handlers.config import read_history_collection
+
+READ_HISTORY_TTL_SECONDS = 30 * 24 * 60 * 60  # Read history entries expire 30 days after the last read
+READ_FILTER_USERS = 10000  # Maximum number of active users with an in-memory read filter
+READ_FILTER_CAPACITY = 1000  # Minimum number of reads a filter is sized for
+READ_FILTER_ERROR_RATE = 0.01  # Target false positive rate of a filter
+READ_FILTER_TTL_SECONDS = 10 * 60  # Filters are reloaded periodically to pick up reads recorded by other workers
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter of strings: no false negatives, a bounded rate of false positives."""
+
+    def __init__(self, capacity: int, error_rate: float = READ_FILTER_ERROR_RATE):
+        self.capacity = capacity
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key: str):
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        first, second = int.from_bytes(digest[:8], "little"), int.from_bytes(digest[8:], "little")
+        return [(first + i * second) % self.size for i in range(self.hash_count)]
+
+    def add(self, key: str):
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key: str):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+
+class ReadHistory:
+    """
+    Per-(user, post) read history with a TTL, and a fast membership check on top of it.
+
+    Every read is one small document that expires READ_HISTORY_TTL_SECONDS after the
+    last read, so the history of heavy readers stays bounded. Active users get an
+    in-memory Bloom filter of their read posts: a negative answer needs no database
+    query, and positive answers are confirmed against the database in one query.
+    """
+
+    def __init__(self, max_users: int = READ_FILTER_USERS):
+        self.max_users = max_users
+        self.filters = OrderedDict()
+        self.loading = {}
+        self.filter_negatives = 0
+        self.confirmed_reads = 0
+        self.false_positives = 0
+
+    async def record(self, user_id: str, post_id: str, read_on: datetime):
+        """
+        Records a post read.
+
+        Args:
+            user_id (str): ID of the reading user.
+            post_id (str): ID of the read post.
+            read_on (datetime): When the post was read.
+
+        Returns:
+            tuple: Whether the post was not read before, and whether it is the first new post
+            the user reads on that day (re-reads of older posts do not count).
+        """
+        day_start = read_on.replace(hour=0, minute=0, second=0, microsecond=0)
+        result, read_today = await asyncio.gather(
+            read_history_collection.update_one(
+                {"user_id": user_id, "post_id": post_id},
+                {"$set": {"read_on": read_on}, "$setOnInsert": {"first_read_on": read_on}},
+                upsert=True
+            ),
+            # read_on is refreshed by re-reads, first_read_on only dates the first read of a post
+            read_history_collection.find_one(
+                {"user_id": user_id, "post_id": {"$ne": post_id}, "first_read_on": {"$gte": day_start}}, {"_id": 1}
+            )
+        )
+
+        entry = self.filters.get(user_id)
+        if entry:
+            entry[1].add(post_id)
+        return result.upserted_id is not None, read_today is None
+
+    async def read_post_ids(self, user_id: str, post_ids: list):
+        """
+        Finds which of the given posts a user has read.
+
+        Args:
+            user_id (str): ID of the user.
+            post_ids (list): IDs of the posts to check.
+
+        Returns:
+            set: The IDs of the posts the user has read.
+        """
+        read_filter = await self._get_filter(user_id)
+        candidates = [post_id for post_id in post_ids if post_id in read_filter]
+        self.filter_negatives += len(post_ids) - len(candidates)
+        if not candidates:
+            return set()
+
+        read = set(await read_history_collection.distinct(
+            "post_id", {"user_id": user_id, "post_id": {"$in": candidates}}
+        ))
+        self.confirmed_reads += len(read)
+        self.false_positives += len(candidates) - len(read)
+        return read
+
+    async def has_read(self, user_id: str, post_id: str):
+        """Returns whether a user has read a post."""
+        return bool(await self.read_post_ids(user_id, [post_id]))
+
+    def get_metrics(self):
+        """Returns the number of active filters and the filter hit counters."""
+        return {
+            "active_filters": len(self.filters),
+            "filter_negatives": self.filter_negatives,
+            "confirmed_reads": self.confirmed_reads,
+            "false_positives": self.false_positives,
+        }
+
+    async def _get_filter(self, user_id: str):
+        entry = self.filters.get(user_id)
+        if entry and entry[0] > time.monotonic() and entry[1].count <= entry[1].capacity:
+            self.filters.move_to_end(user_id)
+            return entry[1]
+
+        # Concurrent requests of the same user share one load
+        if user_id not in self.loading:
+            self.loading[user_id] = asyncio.ensure_future(self._load_filter(user_id))
+        try:
+            return await asyncio.shield(self.loading[user_id])
+        finally:
+            self.loading.pop(user_id, None)
+
+    async def _load_filter(self, user_id: str):
+        post_ids = await read_history_collection.distinct("post_id", {"user_id": user_id})
+        read_filter = BloomFilter(max(READ_FILTER_CAPACITY, 2 * len(post_ids)))
+        for post_id in post_ids:
+            read_filter.add(post_id)
+
+        self.filters[user_id] = (time.monotonic() + READ_FILTER_TTL_SECONDS, read_filter)
+        self.filters.move_to_end(user_id)
+        if len(self.filters) > self.max_users:
+            self.filters.popitem(last=False)
+        return read_filter
+
+
+read_history = ReadHistory()
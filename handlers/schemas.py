@@ -59,6 +59,19 @@ class CommentCreateSchema(BaseModel):
     text: str
     community_id: Optional[str] = None
 
+class PostEnrichmentStatusSchema(BaseModel):
+    post_id: str
+
+class PostTldrStreamSchema(BaseModel):
+    heading: str
+    description: str
+
+class PostCommentsSchema(BaseModel):
+    post_id: str
+    comments: int = 20  # Number of comments per page
+    cursor: Optional[str] = None  # Continuation cursor returned by the previous page
+    community_id: Optional[str] = None
+
 class CommentEditSchema(BaseModel):
     comment_id: str
     text: str
@@ -147,6 +160,7 @@ class ReportClearSchema(BaseModel):
 
 class AlgorithmRecommendPostsSchema(BaseModel):
     posts: int
+    cursor: Optional[str] = None  # Continuation cursor returned by the previous page
 
 class AlgorithmRecommendCommunitySchema(BaseModel):
     communities: int
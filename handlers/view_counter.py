@@ -0,0 +1,97 @@
+import asyncio
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+from handlers.config import posts_collection, VIEW_FLUSH_INTERVAL, VIEW_FLUSH_THRESHOLD
+
+
+class ViewCounterBuffer:
+    """
+    Write-behind buffer for post view counts.
+
+    Views are accumulated in memory per post and written with a single bulk `$inc`
+    every VIEW_FLUSH_INTERVAL seconds, or earlier once VIEW_FLUSH_THRESHOLD distinct
+    posts are waiting, so a trending post costs one write per flush instead of one
+    write per read.
+    """
+
+    def __init__(self, interval: float = VIEW_FLUSH_INTERVAL, threshold: int = VIEW_FLUSH_THRESHOLD):
+        self.interval = interval
+        self.threshold = threshold
+        self.counts = {}
+        self.flush_requested = None
+        self.task = None
+        self.flushed_increments = 0
+        self.flushes = 0
+        self.failed_flushes = 0
+
+    def start(self):
+        """Starts the periodic flush on the running event loop."""
+        self.flush_requested = asyncio.Event()
+        self.task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stops the periodic flush and writes the remaining buffered views."""
+        if self.task:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+        await self.flush()
+
+    def record(self, post_id: str):
+        """Buffers one view of a post."""
+        self.counts[post_id] = self.counts.get(post_id, 0) + 1
+        if len(self.counts) >= self.threshold and self.flush_requested:
+            self.flush_requested.set()
+
+    def pending_views(self, post_id: str) -> int:
+        """Returns the views of a post that are buffered but not written yet."""
+        return self.counts.get(post_id, 0)
+
+    async def flush(self):
+        """Writes every buffered view count to the posts collection."""
+        if not self.counts:
+            return
+        counts, self.counts = self.counts, {}
+
+        post_ids = list(counts)
+        updates = [UpdateOne({"post_id": post_id}, {"$inc": {"views": counts[post_id]}}) for post_id in post_ids]
+        try:
+            await posts_collection.bulk_write(updates, ordered=False)
+        except Exception as e:
+            # Keep the views that were not written so the next flush retries them
+            self.failed_flushes += 1
+            if isinstance(e, BulkWriteError):
+                failed = [post_ids[error["index"]] for error in e.details.get("writeErrors", [])]
+            else:
+                failed = post_ids
+            for post_id in failed:
+                self.counts[post_id] = self.counts.get(post_id, 0) + counts.pop(post_id)
+            print(f"Error flushing view counts: {e}")
+
+        self.flushes += 1
+        self.flushed_increments += sum(counts.values())
+
+    def get_metrics(self):
+        """Returns the buffered and flushed view counters."""
+        return {
+            "pending_posts": len(self.counts),
+            "pending_increments": sum(self.counts.values()),
+            "flushed_increments": self.flushed_increments,
+            "flushes": self.flushes,
+            "failed_flushes": self.failed_flushes,
+        }
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self.flush_requested.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self.flush_requested.clear()
+            await self.flush()
+
+
+view_counter = ViewCounterBuffer()
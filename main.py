@@ -5,24 +5,38 @@ from slowapi.errors import RateLimitExceeded
 from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.util import get_remote_address
 from handlers.schemas import (UserSignup, UserLogin, ResendVerificationRequest, Interests, PostCreateSchema, PostEditSchema, PostDeleteSchema, PostGetSchema, RoleAssignSchema, RoleDeleteSchema, RoleEditSchema, CommunityDeleteSchema, CommunityModerationSchema, ReportClearSchema,
-CommentCreateSchema, CommentDeleteSchema, CommentDislikeSchema, CommentEditSchema, CommentLikeSchema, CommentReportSchema, PostReportSchema, CommunityCreateSchema, RoleCreateSchema, CommunityActionSchema, CommunityReportSchema, HandleSchema, BioSchema, FollowUnfollowSchema, CommunityPostsSchema,
+CommentCreateSchema, PostCommentsSchema, PostEnrichmentStatusSchema, PostTldrStreamSchema, CommentDeleteSchema, CommentDislikeSchema, CommentEditSchema, CommentLikeSchema, CommentReportSchema, PostReportSchema, CommunityCreateSchema, RoleCreateSchema, CommunityActionSchema, CommunityReportSchema, HandleSchema, BioSchema, FollowUnfollowSchema, CommunityPostsSchema,
 AlgorithmRecommendCommunitySchema, AlgorithmRecommendPostsSchema, AlgorithmRecommendUsersSchema, RoleGiveSchema, SocialLinksSchema, PronounsSchema, ChatRequestSchema)
-from generators.gen_post_info import process_post
-from generators.spam_model import classify
+from generators.spam_model import classify, classify_batch, get_spam_model
 from handlers.utils import hash_password, verify_password, generate_profile_picture
+from handlers.comments import fetch_comments_page
+from handlers.moderation import moderation
+from handlers.reactions import toggle_reaction
+from handlers.view_counter import view_counter
+from handlers.profile_cache import author_profiles
+from handlers.engagement import engagement_engine
+from handlers.read_history import read_history
+from handlers.enrichment import enrichment_queue
+from generators.llm_client import llm_client
+from generators.generation_cache import generation_cache
+from generators.gen_post_info import purge_stale_generations, generation_stats, stream_tldr, get_cached_tldr, cache_tldr, truncate_text_to_word_limit
+from generators.tagsystem import determine_tags
 from handlers.email_sender import send_verification_email, send_warn_email, send_ban_email
 from handlers.auth import create_verification_code, verify_verification_code, create_access_token, decode_jwt, oauth
-from handlers.config import user_collection, reports_collection, communities_collection, banned_collection, all_subcategories, community_collection, read_posts_collection, SECRET_KEY, API_HOST, API_PORT, GOOGLE_REDIRECT_URI, GITHUB_REDIRECT_URI, DISCORD_REDIRECT_URI, APPLE_REDIRECT_URI, images_collection, posts_collection, TEAM_MEMBERS_HANDLES, MODEL_TO_USE
-from generators.tagsystem import determine_tags
+from handlers.config import user_collection, reports_collection, communities_collection, banned_collection, all_subcategories, community_collection, post_reactions_collection, comments_collection, comment_reactions_collection, SECRET_KEY, API_HOST, API_PORT, GOOGLE_REDIRECT_URI, GITHUB_REDIRECT_URI, DISCORD_REDIRECT_URI, APPLE_REDIRECT_URI, images_collection, posts_collection, spam_examples_collection, TEAM_MEMBERS_HANDLES, MODEL_TO_USE
 from datetime import datetime, timedelta, timezone
-from algorithm.recommendation import recommend_content
+from algorithm.recommendation import recommend_content, get_source_metrics
+from algorithm.feed import feed_materializer, read_feed, FEED_SIZE
+from algorithm.snapshots import first_page, next_page
+from handlers.models import create_indexes
 from generators.sparkai import ChatSpark
 from bson import ObjectId
-from better_profanity import profanity
 from PIL import Image
 from typing import List
 from uuid import uuid4
 import io
+import json
+import asyncio
 import shutil
 import re
 import random
@@ -33,9 +47,25 @@ limiter = Limiter(key_func=get_remote_address)
 app.state.limiter = limiter
 app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
 app.add_middleware(SessionMiddleware, secret_key=SECRET_KEY)
-profanity.load_censor_words()
 sparkai = ChatSpark(MODEL_TO_USE)
 
+@app.on_event("startup")
+async def startup():
+    get_spam_model()  # Loads the spam model artifact up front, failing fast if it is missing
+    await create_indexes()
+    await purge_stale_generations()
+    feed_materializer.start()
+    view_counter.start()
+    engagement_engine.start()
+    await enrichment_queue.start()
+
+@app.on_event("shutdown")
+async def shutdown():
+    await feed_materializer.stop()
+    await view_counter.stop()
+    await engagement_engine.stop()
+    await enrichment_queue.stop()
+
 # async def validate_access_token(request: Request, response: Response):
 #     """
 #     Validates the access token from cookies. 
@@ -156,8 +186,9 @@ async def validate_access_token(request: Request):
 
 # Helper function to validate tags
 def validate_tags(tags: List[str]):
-    for tag in tags:
-        if profanity.contains_profanity(tag):
+    # All the tags are checked in one pass
+    for tag, (_, hits) in zip(tags, moderation.censor_batch(tags)):
+        if hits:
             raise HTTPException(status_code=400, detail=f"Tag '{tag}' contains inappropriate language and is not allowed.")
 
 async def process_uploaded_image_file(image: UploadFile) -> str:
@@ -221,7 +252,7 @@ async def signup(user: UserSignup, background_tasks: BackgroundTasks):
                 detail=f"Error processing the uploaded image: {str(e)}"
             )
     
-    if profanity.contains_profanity(user.bio):
+    if moderation.contains_profanity(user.bio):
         raise HTTPException(status_code=400, detail="Bio contains inappropriate language and is not allowed.")
         
     existing_user_by_handle = await user_collection.find_one({"handle": handle})
@@ -472,7 +503,7 @@ async def edit_handle(handle_data: HandleSchema, access_payload: dict = Depends(
     
     new_handle = handle_data.handle.lower()  # Convert handle to lowercase
     
-    if profanity.contains_profanity(new_handle):
+    if moderation.contains_profanity(new_handle):
         raise HTTPException(status_code=400, detail="Inappropriate words is not allowed in handle")
 
     # Check if the handle is already taken
@@ -497,7 +528,7 @@ async def edit_handle(bio_data: BioSchema, access_payload: dict = Depends(valida
     if not user_id:
         raise HTTPException(status_code=400, detail="Invalid access token payload")
     
-    if profanity.contains_profanity(bio_data.bio):
+    if moderation.contains_profanity(bio_data.bio):
         raise HTTPException(status_code=400, detail="Inappropriate words is not allowed in bio")
 
     # Update the user's handle in the database
@@ -640,6 +671,7 @@ async def follow_user(
             "$inc": {"following.count": 1},
         },
     )
+    feed_materializer.notify_user(current_user_id)
     return {"message": f"You are now following {target_user['username']}"}
 
 
@@ -684,6 +716,7 @@ async def unfollow_user(
         },
     )
 
+    feed_materializer.notify_user(current_user_id)
     return {"message": f"You have unfollowed {target_user['username']}"}
 
 @app.post("/user/get", dependencies=[Depends(validate_access_token)])
@@ -901,6 +934,7 @@ async def add_interest(interests_data: Interests, access_payload: dict = Depends
             {"_id": ObjectId(user_id)},
             {"$addToSet": {"interests": {"$each": new_interests}}}
         )
+    feed_materializer.notify_user(user_id)
     return {"success": True}
 
 
@@ -934,6 +968,7 @@ async def delete_interest(interests_data: Interests, access_payload: dict = Depe
         {"_id": ObjectId(user_id)},
         {"$pull": {"interests": {"$in": interests_data.interests}}}
     )
+    feed_materializer.notify_user(user_id)
     return {"success": True}
 
 
@@ -969,16 +1004,10 @@ async def create_post(post: PostCreateSchema, access_payload: dict = Depends(val
         raise HTTPException(status_code=400, detail="Invalid image format")
 
     # Profanity check
-    censored_heading = profanity.censor(post.heading)
-    censored_description = profanity.censor(post.description)
-
-    def count_censored_words(original_text, censored_text):
-        original_words = original_text.split()
-        censored_words = censored_text.split()
-        return sum(1 for o, c in zip(original_words, censored_words) if o != c)
-
-    censored_word_count = count_censored_words(post.heading, censored_heading)
-    censored_word_count += count_censored_words(post.description, censored_description)
+    (censored_heading, heading_hits), (censored_description, description_hits) = moderation.censor_batch(
+        [post.heading, post.description]
+    )
+    censored_word_count = heading_hits + description_hits
 
     if censored_word_count > 6:
         raise HTTPException(status_code=400, detail="The post contains too many inappropriate words (more than 6) and cannot be published.")
@@ -992,24 +1021,20 @@ async def create_post(post: PostCreateSchema, access_payload: dict = Depends(val
     if duplicate_post:
         raise HTTPException(status_code=400, detail="You cannot create a post with identical content more than once.")
 
-    # Generate the TLDR
-    tldr_data = process_post(censored_heading, censored_description)
-    tldr = tldr_data.get('tldr')
-    tags = determine_tags(censored_heading, tldr, all_subcategories)
-
     # Prepare the post document
     post_document = {
         "post_id": str(uuid4()),  # Unique post ID
         "user_id": user_id,
         "heading": censored_heading,
-        "tldr": tldr,
+        "tldr": None,  # The TLDR and tags are generated by the enrichment queue
         "description": censored_description,
-        "tags": tags,
+        "tags": [],
+        "enrichment": "pending",
         "image": image_url,
-        "likes": {"count": 0, "users": []},
-        "dislikes": {"count": 0, "users": []},
+        "likes": {"count": 0},
+        "dislikes": {"count": 0},
         "views": 0,
-        "comments": [],
+        "comment_count": 0,
         "created_on": datetime.now(timezone.utc)
     }
 
@@ -1026,15 +1051,93 @@ async def create_post(post: PostCreateSchema, access_payload: dict = Depends(val
         # Add the community_id field
         post_document["community_id"] = post.community_id
 
-    # Insert the post into the posts collection
+    # Insert the post into the posts collection and queue the generation of its TLDR and tags
     await posts_collection.insert_one(post_document)
+    await enrichment_queue.enqueue(post_document["post_id"])
 
     return {
         "success": True,
         "message": "Post created successfully" + (f" in community '{post.community_id}'" if post.community_id else ""),
-        "post_id": post_document["post_id"]
+        "post_id": post_document["post_id"],
+        "enrichment": "pending"
     }
 
+@app.post("/post/tldr/stream", dependencies=[Depends(validate_access_token)])
+async def stream_post_tldr(post: PostTldrStreamSchema, access_payload: dict = Depends(validate_access_token)):
+    user_id = access_payload.get("user_id")
+    if not user_id:
+        raise HTTPException(status_code=400, detail="Invalid access token payload")
+
+    if len(post.heading) > 250:
+        raise HTTPException(status_code=400, detail="Heading cannot exceed 250 characters")
+    if len(post.description) > 1000:
+        raise HTTPException(status_code=400, detail="Description cannot exceed 1000 characters")
+
+    # Censored like /post/create, so the enrichment of the created post finds the streamed TLDR
+    (heading, _), (description, _) = moderation.censor_batch([post.heading, post.description])
+
+    def event(name, data):
+        return f"event: {name}\ndata: {json.dumps(data)}\n\n"
+
+    async def events():
+        tldr = await get_cached_tldr(heading, description)
+        if tldr:
+            yield event("token", {"text": tldr})
+            tags = await asyncio.to_thread(determine_tags, heading, tldr, all_subcategories)
+            yield event("done", {"tldr": tldr, "tags": tags})
+            return
+
+        tldr = ""
+        try:
+            async for text in stream_tldr(heading, description):
+                tldr += text
+                yield event("token", {"text": text})
+        except asyncio.TimeoutError:
+            yield event("error", {"error": "The generation timed out."})
+            return
+        except Exception as e:
+            yield event("error", {"error": str(e)})
+            return
+
+        tldr = truncate_text_to_word_limit(tldr.strip(), word_limit=400)
+        if not tldr:
+            yield event("error", {"error": "No TLDR generated"})
+            return
+        # The tags are finalized from the complete TLDR, off the event loop like the enrichment queue
+        tags = await asyncio.to_thread(determine_tags, heading, tldr, all_subcategories)
+        # The enrichment of the created post reuses the TLDR instead of generating it again
+        await cache_tldr(heading, description, tldr)
+        yield event("done", {"tldr": tldr, "tags": tags})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.post("/post/enrichment/status", dependencies=[Depends(validate_access_token)])
+async def get_post_enrichment_status(data: PostEnrichmentStatusSchema, access_payload: dict = Depends(validate_access_token)):
+    user_id = access_payload.get("user_id")
+    if not user_id:
+        raise HTTPException(status_code=400, detail="Invalid access token payload")
+
+    post, job = await asyncio.gather(
+        posts_collection.find_one({"post_id": data.post_id}, {"tldr": 1, "tags": 1, "enrichment": 1}),
+        enrichment_queue.get_status(data.post_id)
+    )
+    if not post:
+        raise HTTPException(status_code=404, detail="Post not found")
+
+    # Posts created before the enrichment queue (and system posts) are generated up front
+    status = post.get("enrichment", "done")
+    response = {"success": True, "status": status, "attempts": job["attempts"] if job else 0}
+    if status == "done":
+        response["tldr"] = post["tldr"]
+        response["tags"] = post["tags"]
+    elif status == "failed" and job:
+        response["error"] = job["error"]
+    return response
+
 @app.post("/post/edit", dependencies=[Depends(validate_access_token)])
 async def edit_post(updates: PostEditSchema, access_payload: dict = Depends(validate_access_token)):
     user_id = access_payload.get("user_id")
@@ -1082,38 +1185,26 @@ async def edit_post(updates: PostEditSchema, access_payload: dict = Depends(vali
     if not changes_made:
         raise HTTPException(status_code=400, detail="No changes detected in the provided data")
 
-    # Validate for spam
-    if "heading" in update_data and classify(update_data["heading"]):
-        raise HTTPException(status_code=400, detail="The post heading is flagged as spam")
-    if "description" in update_data and classify(update_data["description"]):
-        raise HTTPException(status_code=400, detail="The post description is flagged as spam")
-
-    def count_censored_words(original_text, censored_text):
-        original_words = original_text.split()
-        censored_words = censored_text.split()
-        return sum(1 for o, c in zip(original_words, censored_words) if o != c)
+    # Validate for spam, the edited fields are classified in one batch
+    spam_fields = [field for field in ("heading", "description") if field in update_data]
+    for field, is_spam in zip(spam_fields, classify_batch([update_data[field] for field in spam_fields])):
+        if is_spam:
+            raise HTTPException(status_code=400, detail=f"The post {field} is flagged as spam")
 
-    # Profanity filter and censorship count
+    # Profanity filter and censorship count, the edited fields are censored in one pass
     censored_word_count = 0
-    if "heading" in update_data:
-        censored_heading = profanity.censor(update_data["heading"])
-        censored_word_count += count_censored_words(update_data["heading"], censored_heading)
-        update_data["heading"] = censored_heading
-
-    if "description" in update_data:
-        censored_description = profanity.censor(update_data["description"])
-        censored_word_count += count_censored_words(update_data["description"], censored_description)
-        update_data["description"] = censored_description
+    for field, (censored_text, hits) in zip(spam_fields, moderation.censor_batch([update_data[field] for field in spam_fields])):
+        censored_word_count += hits
+        update_data[field] = censored_text
 
     # Check if the total censored word count exceeds the limit
     if censored_word_count > 6:
         raise HTTPException(status_code=400, detail="The post contains too many inappropriate words (more than 6) and cannot be updated.")
 
-    # If heading or description is updated, regenerate the TLDR
-    if "heading" in update_data or "description" in update_data:
-        tldr_data = determine_tags(update_data.get("heading", post["heading"]), 
-                                 update_data.get("description", post["description"]), all_subcategories)
-        update_data["tldr"] = tldr_data["tldr"]
+    # If heading or description is updated, regenerate the TLDR and tags in the background
+    regenerate = "heading" in update_data or "description" in update_data
+    if regenerate:
+        update_data["enrichment"] = "pending"
 
     # Process the image if updated
     if "image" in update_data:
@@ -1133,131 +1224,73 @@ async def edit_post(updates: PostEditSchema, access_payload: dict = Depends(vali
 
     # Update the post in the posts_collection
     await posts_collection.update_one({"post_id": updates.post_id}, {"$set": update_data})
+    if regenerate:
+        await enrichment_queue.enqueue(updates.post_id)
+    feed_materializer.notify_post(updates.post_id)
 
     return {"success": True, "message": "Post updated successfully"}
 
+async def resolve_post_author(post: dict):
+    """Resolves the display name and profile picture URL of the author of a post."""
+    post_user_name = post.get("user_name", None)
+    post_user_pfp = post.get("user_pfp", None)
+
+    if post_user_name and post_user_pfp:
+        # If user_name and user_pfp exist in the post (system-generated post)
+        return post_user_name, post_user_pfp
+
+    # Check for user_id in the post (user-generated post)
+    post_user_id = post.get("user_id", None)
+    if post_user_id:
+        return await author_profiles.get(post_user_id)
+    return "Unknown", None
+
 @app.post("/post/get", dependencies=[Depends(validate_access_token)])
 async def get_post_details(post_search: PostGetSchema, access_payload: dict = Depends(validate_access_token)):
     user_id = access_payload.get("user_id")
     if not user_id:
         raise HTTPException(status_code=400, detail="Invalid access token payload")
 
-    # If community_id is provided, check if the user is a member of the community
+    # Fetch the post from posts_collection, optionally filtering by community_id
+    query = {"post_id": post_search.post_id}
+    if post_search.community_id:
+        query["community_id"] = post_search.community_id
+
+    # The membership check, the post, the reader's own reaction and the reader's account
+    # are independent, so they are fetched concurrently
+    lookups = [
+        posts_collection.find_one(query),
+        post_reactions_collection.find_one({"post_id": post_search.post_id, "user_id": user_id}, {"type": 1}),
+        user_collection.find_one({"_id": ObjectId(user_id)}, {"_id": 1}),
+    ]
     if post_search.community_id:
         # Check if the user is a member of the community by looking in the community_collection
-        community_member = await community_collection.find_one({
+        lookups.append(community_collection.find_one({
             "community_id": post_search.community_id,
             "user_id": user_id
-        })
-        if not community_member:
-            raise HTTPException(status_code=403, detail="You are not a member of this community")
+        }, {"_id": 1}))
 
-    # Fetch the post from posts_collection, optionally filtering by community_id
-    query = {"post_id": post_search.post_id}
-    if post_search.community_id:
-        query["community_id"] = post_search.community_id
+    post, reaction, user_data, *community_member = await asyncio.gather(*lookups)
 
-    post = await posts_collection.find_one(query)
+    if post_search.community_id and not community_member[0]:
+        raise HTTPException(status_code=403, detail="You are not a member of this community")
     if not post:
         raise HTTPException(status_code=404, detail="Post not found")
-
-    # Update the post's view count if the viewer is not the author
-    post_author_id = post.get("user_id")
-    if post_author_id != user_id:
-        await posts_collection.update_one(
-            {"post_id": post_search.post_id},
-            {"$inc": {"views": 1}}
-        )
-
-    # Fetch streak-related variables from the user's profile
-    user_data = await user_collection.find_one({"_id": ObjectId(user_id)})
     if not user_data:
         raise HTTPException(status_code=404, detail="User not found")
 
-    streak = user_data.get("streak", 0)
-    lumens = user_data.get("lumens", 1)
-    last_streak_update = user_data.get("last_streak_update", None)
-    posts_read_count = user_data.get("posts_read_count", 0)
-
-    current_time = datetime.utcnow()
-
-    # Handle streak logic: Increment streak once per day
-    if last_streak_update:
-        time_diff = current_time - last_streak_update
-        if time_diff.total_seconds() > 86400:  # More than 24 hours
-            streak = 0
-            posts_read_count = 0  # Reset posts_read_count when streak is reset
-
-    # Use read_posts_collection to track recently read posts
-    read_posts = await read_posts_collection.find_one({"user_id": user_id})
-
-    # Initialize the posts object if it doesn't exist
-    if not read_posts:
-        read_posts = {"user_id": user_id, "posts": {}}
-
-    # Check if the post was already read
-    if post_search.post_id not in read_posts["posts"]:
-        # If it's the first post of the day (read_posts["posts"] is empty), increment the streak
-        if len(read_posts["posts"]) == 0:
-            streak += 1  # Increment streak once when the first post of the day is read
-
-        # Increment posts_read_count only if the post hasn't been read today
-        posts_read_count += 1
-
-        # Add the post_id to the user's read posts as a key
-        await read_posts_collection.update_one(
-            {"user_id": user_id},
-            {"$set": {f"posts.{post_search.post_id}": True}},  # Store post_id as a key with a value of True
-            upsert=True  # Create a new record if it doesn't exist
-        )
+    # Update the post's view count if the viewer is not the author (written in batches by the view counter)
+    post_author_id = post.get("user_id")
+    if post_author_id != user_id:
+        view_counter.record(post_search.post_id)
 
-    # Earn lumens point for every 25 posts read
-    if posts_read_count % 25 == 0:
-        lumens += 1
-
-    # Update user data in the database
-    await user_collection.update_one(
-        {"_id": ObjectId(user_id)},
-        {
-            "$set": {
-                "streak": streak,
-                "lumens": lumens,
-                "last_streak_update": current_time,
-                "posts_read_count": posts_read_count
-            }
-        }
-    )
+    # The streak, lumens and read posts are updated by the engagement engine
+    engagement_engine.record_read(user_id, post_search.post_id)
 
     # Resolve user information for the post
-    post_user_name = post.get("user_name", None)
-    post_user_pfp = post.get("user_pfp", None)
+    user, pfp = await resolve_post_author(post)
 
-    if post_user_name and post_user_pfp:
-        # If user_name and user_pfp exist in the post (system-generated post)
-        user = post_user_name
-        pfp = post_user_pfp
-    else:
-        # Check for user_id in the post (user-generated post)
-        post_user_id = post.get("user_id", None)
-        if post_user_id:
-            try:
-                user_info = await user_collection.find_one(
-                    {"_id": ObjectId(post_user_id)}, {"username": 1, "profile_picture.url": 1}
-                )
-                if user_info:
-                    user = user_info.get("username", "Unknown")
-                    pfp = user_info.get("profile_picture", {}).get("url", None)
-                else:
-                    user = "Unknown"
-                    pfp = None
-            except Exception:
-                user = "Unknown"
-                pfp = None
-        else:
-            user = "Unknown"
-            pfp = None
-
-    # Return the post details along with updated streak and lumens
+    # Return the post details
     post_details = {
         "post_id": post["post_id"],
         "community_id": post.get("community_id", None),
@@ -1269,11 +1302,13 @@ async def get_post_details(post_search: PostGetSchema, access_payload: dict = De
         "description": post.get("description", None),
         "post_link": post.get("post_link", None),
         "tags": post["tags"],
+        "enrichment": post.get("enrichment", "done"),
         "created_on": post["created_on"],
         "likes": post["likes"],
-        "views": post["views"],
+        "views": post["views"] + view_counter.pending_views(post["post_id"]),
         "dislikes": post["dislikes"],
-        "comments": post["comments"]
+        "reaction": reaction["type"] if reaction else None,
+        "comment_count": post["comment_count"]
     }
 
     return {"success": True, "post_details": post_details}
@@ -1317,186 +1352,71 @@ async def delete_post(data: PostDeleteSchema, access_payload: dict = Depends(val
         if post["user_id"] != user_id:
             raise HTTPException(status_code=403, detail="You are not authorized to delete this post")
 
-    # Delete the post from the posts_collection
+    # Delete the post from the posts_collection along with its reactions and comments
     await posts_collection.delete_one({"post_id": data.post_id})
+    await post_reactions_collection.delete_many({"post_id": data.post_id})
+    comment_ids = await comments_collection.distinct("comment_id", {"post_id": data.post_id})
+    await comments_collection.delete_many({"post_id": data.post_id})
+    await comment_reactions_collection.delete_many({"comment_id": {"$in": comment_ids}})
+    feed_materializer.notify_post(data.post_id)
 
     return {"success": True, "message": "Post deleted successfully"}
 
-@app.post("/post/like", dependencies=[Depends(validate_access_token)])
-async def like_post(post_data: PostGetSchema, access_payload: dict = Depends(validate_access_token)):
-    user_id = access_payload.get("user_id")
-    if not user_id:
-        raise HTTPException(status_code=400, detail="Invalid access token payload")
-    
+async def react_to_post(post_data: PostGetSchema, user_id: str, reaction_type: str):
+    """
+    Toggles a like or dislike of a user on a global or community post.
+
+    Args:
+        post_data (PostGetSchema): The post (and optional community) being reacted to.
+        user_id (str): ID of the reacting user.
+        reaction_type (str): "like" or "dislike".
+
+    Returns:
+        dict: The new likes and dislikes counts and the user's reaction (None once removed).
+    """
+    post_query = {"post_id": post_data.post_id}
+
     # Check if community_id is provided
     if post_data.community_id:
-        # Find the community
-        community = await communities_collection.find_one({"community_id": post_data.community_id})
+        # Find the community and check if the user is a member of it
+        community, community_member = await asyncio.gather(
+            communities_collection.find_one({"community_id": post_data.community_id}, {"_id": 1}),
+            community_collection.find_one({"community_id": post_data.community_id, "user_id": user_id}, {"_id": 1})
+        )
         if not community:
             raise HTTPException(status_code=404, detail="Community not found")
-        
-        # Check if the user is a member of the community
-        community_member = await community_collection.find_one({
-            "community_id": post_data.community_id,
-            "user_id": user_id
-        })
         if not community_member:
-            raise HTTPException(status_code=403, detail="You are not a member of this community and cannot like this post")
-        
-        # Find the post in posts_collection
-        post = await posts_collection.find_one({"post_id": post_data.post_id, "community_id": post_data.community_id})
-        if not post:
+            raise HTTPException(status_code=403, detail=f"You are not a member of this community and cannot {reaction_type} this post")
+        post_query["community_id"] = post_data.community_id
+
+    result = await toggle_reaction(post_reactions_collection, posts_collection, post_query, "post_id", user_id, reaction_type)
+    if result is None:
+        if post_data.community_id:
             raise HTTPException(status_code=404, detail="Post not found in the specified community")
+        raise HTTPException(status_code=404, detail="Post not found")
 
-        # Check if the user has already liked the post
-        user_liked = user_id in post["likes"]["users"]
-        user_disliked = user_id in post["dislikes"]["users"]
-
-        if user_liked:
-            # Remove the user's like
-            await posts_collection.update_one(
-                {"post_id": post_data.post_id, "community_id": post_data.community_id},
-                {
-                    "$pull": {"likes.users": user_id},
-                    "$inc": {"likes.count": -1}
-                }
-            )
-            return {"success": True, "message": "Like removed"}
-        else:
-            # Add the user's like and ensure their dislike is removed if present
-            update_query = {
-                "$addToSet": {"likes.users": user_id},
-                "$inc": {"likes.count": 1}
-            }
-            if user_disliked:
-                update_query["$pull"] = {"dislikes.users": user_id}
-                update_query["$inc"]["dislikes.count"] = -1
-            
-            await posts_collection.update_one(
-                {"post_id": post_data.post_id, "community_id": post_data.community_id},
-                update_query
-            )
-            return {"success": True, "message": "Post liked"}
-    else:
-        # Fallback to the global posts_collection if no community_id is provided
-        post = await posts_collection.find_one({"post_id": post_data.post_id})
-        if not post:
-            raise HTTPException(status_code=404, detail="Post not found")
-        
-        # Check if the user has already liked the post
-        user_liked = user_id in post["likes"]["users"]
-        user_disliked = user_id in post["dislikes"]["users"]
-
-        if user_liked:
-            # Remove the user's like
-            await posts_collection.update_one(
-                {"post_id": post_data.post_id},
-                {
-                    "$pull": {"likes.users": user_id},
-                    "$inc": {"likes.count": -1}
-                }
-            )
-            return {"success": True, "message": "Like removed"}
-        else:
-            # Add the user's like and ensure their dislike is removed if present
-            update_query = {
-                "$addToSet": {"likes.users": user_id},
-                "$inc": {"likes.count": 1}
-            }
-            if user_disliked:
-                update_query["$pull"] = {"dislikes.users": user_id}
-                update_query["$inc"]["dislikes.count"] = -1
-            
-            await posts_collection.update_one({"post_id": post_data.post_id}, update_query)
-            return {"success": True, "message": "Post liked"}
+    feed_materializer.notify_post(post_data.post_id)
+    return result
+
+@app.post("/post/like", dependencies=[Depends(validate_access_token)])
+async def like_post(post_data: PostGetSchema, access_payload: dict = Depends(validate_access_token)):
+    user_id = access_payload.get("user_id")
+    if not user_id:
+        raise HTTPException(status_code=400, detail="Invalid access token payload")
+
+    result = await react_to_post(post_data, user_id, "like")
+    message = "Post liked" if result["reaction"] == "like" else "Like removed"
+    return {"success": True, "message": message, **result}
 
 @app.post("/post/dislike", dependencies=[Depends(validate_access_token)])
 async def dislike_post(post_data: PostGetSchema, access_payload: dict = Depends(validate_access_token)):
     user_id = access_payload.get("user_id")
     if not user_id:
         raise HTTPException(status_code=400, detail="Invalid access token payload")
-    
-    # Check if community_id is provided
-    if post_data.community_id:
-        # Find the community
-        community = await communities_collection.find_one({"community_id": post_data.community_id})
-        if not community:
-            raise HTTPException(status_code=404, detail="Community not found")
-        
-        # Check if the user is a member of the community
-        community_member = await community_collection.find_one({
-            "community_id": post_data.community_id,
-            "user_id": user_id
-        })
-        if not community_member:
-            raise HTTPException(status_code=403, detail="You are not a member of this community and cannot dislike this post")
-        
-        # Find the post in posts_collection
-        post = await posts_collection.find_one({"post_id": post_data.post_id, "community_id": post_data.community_id})
-        if not post:
-            raise HTTPException(status_code=404, detail="Post not found in the specified community")
 
-        # Check if the user has already disliked the post
-        user_liked = user_id in post["likes"]["users"]
-        user_disliked = user_id in post["dislikes"]["users"]
-
-        if user_disliked:
-            # Remove the user's dislike
-            await posts_collection.update_one(
-                {"post_id": post_data.post_id, "community_id": post_data.community_id},
-                {
-                    "$pull": {"dislikes.users": user_id},
-                    "$inc": {"dislikes.count": -1}
-                }
-            )
-            return {"success": True, "message": "Dislike removed"}
-        else:
-            # Add the user's dislike and ensure their like is removed if present
-            update_query = {
-                "$addToSet": {"dislikes.users": user_id},
-                "$inc": {"dislikes.count": 1}
-            }
-            if user_liked:
-                update_query["$pull"] = {"likes.users": user_id}
-                update_query["$inc"]["likes.count"] = -1
-            
-            await posts_collection.update_one(
-                {"post_id": post_data.post_id, "community_id": post_data.community_id},
-                update_query
-            )
-            return {"success": True, "message": "Post disliked"}
-    else:
-        # Fallback to the global posts_collection if no community_id is provided
-        post = await posts_collection.find_one({"post_id": post_data.post_id})
-        if not post:
-            raise HTTPException(status_code=404, detail="Post not found")
-        
-        # Check if the user has already disliked the post
-        user_liked = user_id in post["likes"]["users"]
-        user_disliked = user_id in post["dislikes"]["users"]
-
-        if user_disliked:
-            # Remove the user's dislike
-            await posts_collection.update_one(
-                {"post_id": post_data.post_id},
-                {
-                    "$pull": {"dislikes.users": user_id},
-                    "$inc": {"dislikes.count": -1}
-                }
-            )
-            return {"success": True, "message": "Dislike removed"}
-        else:
-            # Add the user's dislike and ensure their like is removed if present
-            update_query = {
-                "$addToSet": {"dislikes.users": user_id},
-                "$inc": {"dislikes.count": 1}
-            }
-            if user_liked:
-                update_query["$pull"] = {"likes.users": user_id}
-                update_query["$inc"]["likes.count"] = -1
-            
-            await posts_collection.update_one({"post_id": post_data.post_id}, update_query)
-            return {"success": True, "message": "Post disliked"}
+    result = await react_to_post(post_data, user_id, "dislike")
+    message = "Post disliked" if result["reaction"] == "dislike" else "Dislike removed"
+    return {"success": True, "message": message, **result}
 
 @app.post("/post/comment/create", dependencies=[Depends(validate_access_token)])
 async def create_comment(
@@ -1521,8 +1441,8 @@ async def create_comment(
         if not community_member:
             raise HTTPException(status_code=403, detail="You are not a member of this community and cannot comment")
 
-    # Find the post in the global posts collection
-    post = await posts_collection.find_one({"post_id": comment_data.post_id})
+    # Check that the post exists in the global posts collection
+    post = await posts_collection.find_one({"post_id": comment_data.post_id}, {"_id": 1})
     if not post:
         raise HTTPException(status_code=404, detail="Post not found")
 
@@ -1530,14 +1450,7 @@ async def create_comment(
     if classify(comment_data.text):
         raise HTTPException(status_code=400, detail="The comment is flagged as spam")
 
-    censored_text = profanity.censor(comment_data.text)
-
-    def count_censored_words(original_text, censored_text):
-        original_words = original_text.split()
-        censored_words = censored_text.split()
-        return sum(1 for o, c in zip(original_words, censored_words) if o != c)
-
-    censored_word_count = count_censored_words(comment_data.text, censored_text)
+    censored_text, censored_word_count = moderation.censor(comment_data.text)
     if censored_word_count > 6:
         raise HTTPException(status_code=400, detail="The comment contains too many inappropriate words (more than 6) and cannot be created.")
 
@@ -1550,9 +1463,8 @@ async def create_comment(
         raise HTTPException(status_code=500, detail=f"Error fetching user details: {str(e)}")
 
     # Ensure no duplicate comment by the same user
-    existing_comment = next(
-        (comment for comment in post.get("comments", []) if comment["user_id"] == user_id and comment["text"] == comment_data.text),
-        None
+    existing_comment = await comments_collection.find_one(
+        {"post_id": comment_data.post_id, "user_id": user_id, "text": censored_text}, {"_id": 1}
     )
     if existing_comment:
         raise HTTPException(status_code=400, detail="You cannot post the same comment text multiple times.")
@@ -1560,23 +1472,57 @@ async def create_comment(
     comment_id = str(uuid4())
     new_comment = {
         "comment_id": comment_id,
+        "post_id": comment_data.post_id,
         "user_id": user_id,
         "username": username,
         "pfp": pfp,
         "text": censored_text,
-        "likes": {"count": 0, "users": []},
-        "dislikes": {"count": 0, "users": []},
+        "likes": {"count": 0},
+        "dislikes": {"count": 0},
         "created_on": datetime.utcnow()
     }
 
-    # Add comment to the global post
+    # Store the comment and count it on the post
+    await comments_collection.insert_one(new_comment)
     await posts_collection.update_one(
         {"post_id": comment_data.post_id},
-        {"$push": {"comments": new_comment}}
+        {"$inc": {"comment_count": 1}}
     )
+    feed_materializer.notify_post(comment_data.post_id)
 
     return {"success": True, "message": "Comment added successfully", "comment_id": comment_id}
 
+@app.post("/post/comments", dependencies=[Depends(validate_access_token)])
+async def get_post_comments(data: PostCommentsSchema, access_payload: dict = Depends(validate_access_token)):
+    user_id = access_payload.get("user_id")
+    if not user_id:
+        raise HTTPException(status_code=400, detail="Invalid access token payload")
+
+    if data.comments <= 0:
+        raise HTTPException(status_code=400, detail="Number of comments must be greater than 0")
+
+    # If community_id is provided, check if the user is a member of the community
+    query = {"post_id": data.post_id}
+    if data.community_id:
+        community_member = await community_collection.find_one({
+            "community_id": data.community_id,
+            "user_id": user_id
+        })
+        if not community_member:
+            raise HTTPException(status_code=403, detail="You are not a member of this community")
+        query["community_id"] = data.community_id
+
+    post = await posts_collection.find_one(query, {"_id": 1})
+    if not post:
+        raise HTTPException(status_code=404, detail="Post not found")
+
+    try:
+        comments, next_cursor = await fetch_comments_page(data.post_id, data.comments, data.cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    return {"success": True, "comments": comments, "next_cursor": next_cursor}
+
 @app.post("/post/comment/edit", dependencies=[Depends(validate_access_token)])
 async def edit_comment(data: CommentEditSchema, access_payload: dict = Depends(validate_access_token)):
     user_id = access_payload.get("user_id")
@@ -1598,41 +1544,29 @@ async def edit_comment(data: CommentEditSchema, access_payload: dict = Depends(v
         if not community_member:
             raise HTTPException(status_code=403, detail="You are not a member of this community and cannot edit this comment")
 
-    # Find the post in the global posts collection
-    post = await posts_collection.find_one({"comments.comment_id": data.comment_id})
-    if not post:
+    # Find the comment
+    comment = await comments_collection.find_one({"comment_id": data.comment_id}, {"user_id": 1, "text": 1})
+    if not comment:
         raise HTTPException(status_code=404, detail="Comment not found")
 
     # Validate the comment text
     if classify(data.text):
         raise HTTPException(status_code=400, detail="The comment is flagged as spam")
 
-    censored_text = profanity.censor(data.text)
-
-    def count_censored_words(original_text, censored_text):
-        original_words = original_text.split()
-        censored_words = censored_text.split()
-        return sum(1 for o, c in zip(original_words, censored_words) if o != c)
-
-    censored_word_count = count_censored_words(data.text, censored_text)
+    censored_text, censored_word_count = moderation.censor(data.text)
     if censored_word_count > 6:
         raise HTTPException(status_code=400, detail="The comment contains too many inappropriate words (more than 6) and cannot be edited.")
 
-    # Find the comment
-    comment = next((c for c in post["comments"] if c["comment_id"] == data.comment_id), None)
-    if not comment:
-        raise HTTPException(status_code=404, detail="Comment not found")
-
     if comment["user_id"] != user_id:
         raise HTTPException(status_code=403, detail="You are not authorized to edit this comment")
 
     if comment["text"] == data.text:
         raise HTTPException(status_code=400, detail="No changes detected in the comment text")
 
-    # Update comment in the global post
-    await posts_collection.update_one(
-        {"comments.comment_id": data.comment_id},
-        {"$set": {"comments.$.text": censored_text}}
+    # Update the comment
+    await comments_collection.update_one(
+        {"comment_id": data.comment_id},
+        {"$set": {"text": censored_text}}
     )
 
     return {"success": True, "message": "Comment edited successfully"}
@@ -1658,24 +1592,23 @@ async def delete_comment(data: CommentDeleteSchema, access_payload: dict = Depen
         if not community_member:
             raise HTTPException(status_code=403, detail="You are not a member of this community and cannot delete this comment")
 
-    # Find the post containing the comment in the global posts collection
-    post = await posts_collection.find_one({"comments.comment_id": data.comment_id})
-    if not post:
-        raise HTTPException(status_code=404, detail="Comment not found")
-
-    # Find the specific comment
-    comment = next((c for c in post["comments"] if c["comment_id"] == data.comment_id), None)
+    # Find the comment
+    comment = await comments_collection.find_one({"comment_id": data.comment_id}, {"post_id": 1, "user_id": 1})
     if not comment:
         raise HTTPException(status_code=404, detail="Comment not found")
 
     if comment["user_id"] != user_id:
         raise HTTPException(status_code=403, detail="You are not authorized to delete this comment")
 
-    # Delete the comment from the global post
-    await posts_collection.update_one(
-        {"post_id": post["post_id"]},
-        {"$pull": {"comments": {"comment_id": data.comment_id}}}
-    )
+    # Delete the comment and its reactions, and uncount it on the post
+    result = await comments_collection.delete_one({"comment_id": data.comment_id})
+    if result.deleted_count:
+        await comment_reactions_collection.delete_many({"comment_id": data.comment_id})
+        await posts_collection.update_one(
+            {"post_id": comment["post_id"]},
+            {"$inc": {"comment_count": -1}}
+        )
+    feed_materializer.notify_post(comment["post_id"])
 
     return {"success": True, "message": "Comment deleted successfully"}
 
@@ -1700,46 +1633,14 @@ async def like_comment(data: CommentLikeSchema, access_payload: dict = Depends(v
         if not community_member:
             raise HTTPException(status_code=403, detail="You are not a member of this community and cannot like this comment")
 
-    # Find the post containing the comment in the global posts collection
-    post = await posts_collection.find_one({"comments.comment_id": data.comment_id})
-    if not post:
-        raise HTTPException(status_code=404, detail="Comment not found")
-
-    # Find the specific comment inside the post
-    comment = next((c for c in post["comments"] if c["comment_id"] == data.comment_id), None)
-    if not comment:
-        raise HTTPException(status_code=404, detail="Comment not found")
-
-    # Check if the user already liked or disliked the comment
-    user_already_liked = user_id in comment["likes"]["users"]
-    user_already_disliked = user_id in comment["dislikes"]["users"]
-
-    update_query = {}
-
-    if user_already_liked:
-        # Remove the like
-        update_query = {
-            "$pull": {"comments.$[comment].likes.users": user_id},
-            "$inc": {"comments.$[comment].likes.count": -1}
-        }
-    else:
-        # Add the like
-        update_query["$addToSet"] = {"comments.$[comment].likes.users": user_id}
-        update_query["$inc"] = {"comments.$[comment].likes.count": 1}
-
-        if user_already_disliked:
-            # Remove the dislike
-            update_query["$pull"] = {"comments.$[comment].dislikes.users": user_id}
-            update_query["$inc"] = {"comments.$[comment].dislikes.count": -1}
-
-    # Update the comment in the post
-    await posts_collection.update_one(
-        {"comments.comment_id": data.comment_id},
-        update_query,
-        array_filters=[{"comment.comment_id": data.comment_id}]
+    # Toggle the like and adjust the comment counters
+    result = await toggle_reaction(
+        comment_reactions_collection, comments_collection, {"comment_id": data.comment_id}, "comment_id", user_id, "like"
     )
+    if result is None:
+        raise HTTPException(status_code=404, detail="Comment not found")
 
-    return {"success": True, "message": "Comment liked/unliked successfully"}
+    return {"success": True, "message": "Comment liked/unliked successfully", **result}
 
 @app.post("/comment/dislike", dependencies=[Depends(validate_access_token)])
 async def dislike_comment(data: CommentDislikeSchema, access_payload: dict = Depends(validate_access_token)):
@@ -1762,46 +1663,14 @@ async def dislike_comment(data: CommentDislikeSchema, access_payload: dict = Dep
         if not community_member:
             raise HTTPException(status_code=403, detail="You are not a member of this community and cannot dislike this comment")
 
-    # Find the post containing the comment in the global posts collection
-    post = await posts_collection.find_one({"comments.comment_id": data.comment_id})
-    if not post:
-        raise HTTPException(status_code=404, detail="Comment not found")
-
-    # Find the specific comment inside the post
-    comment = next((c for c in post["comments"] if c["comment_id"] == data.comment_id), None)
-    if not comment:
-        raise HTTPException(status_code=404, detail="Comment not found")
-
-    # Check if the user already liked or disliked the comment
-    user_already_liked = user_id in comment["likes"]["users"]
-    user_already_disliked = user_id in comment["dislikes"]["users"]
-
-    update_query = {}
-
-    if user_already_disliked:
-        # Remove the dislike
-        update_query = {
-            "$pull": {"comments.$[comment].dislikes.users": user_id},
-            "$inc": {"comments.$[comment].dislikes.count": -1}
-        }
-    else:
-        # Add the dislike
-        update_query["$addToSet"] = {"comments.$[comment].dislikes.users": user_id}
-        update_query["$inc"] = {"comments.$[comment].dislikes.count": 1}
-
-        if user_already_liked:
-            # Remove the like
-            update_query["$pull"] = {"comments.$[comment].likes.users": user_id}
-            update_query["$inc"] = {"comments.$[comment].likes.count": -1}
-
-    # Update the comment in the post
-    await posts_collection.update_one(
-        {"comments.comment_id": data.comment_id},
-        update_query,
-        array_filters=[{"comment.comment_id": data.comment_id}]
+    # Toggle the dislike and adjust the comment counters
+    result = await toggle_reaction(
+        comment_reactions_collection, comments_collection, {"comment_id": data.comment_id}, "comment_id", user_id, "dislike"
     )
+    if result is None:
+        raise HTTPException(status_code=404, detail="Comment not found")
 
-    return {"success": True, "message": "Comment disliked/undisliked successfully"}
+    return {"success": True, "message": "Comment disliked/undisliked successfully", **result}
 
 
 @app.post("/post/report", dependencies=[Depends(validate_access_token)])
@@ -1874,13 +1743,8 @@ async def report_comment(report_data: CommentReportSchema, access_payload: dict
     if len(report_data.description) > 1000:
         raise HTTPException(status_code=400, detail="Description cannot exceed 1000 characters")
 
-    # Fetch the post containing the comment in the global posts collection
-    post = await posts_collection.find_one({"comments.comment_id": report_data.comment_id})
-    if not post:
-        raise HTTPException(status_code=404, detail="Comment not found")
-
-    # Find the specific comment in the post
-    comment = next((c for c in post["comments"] if c["comment_id"] == report_data.comment_id), None)
+    # Fetch the comment
+    comment = await comments_collection.find_one({"comment_id": report_data.comment_id}, {"text": 1, "user_id": 1})
     if not comment:
         raise HTTPException(status_code=404, detail="Comment not found")
 
@@ -1925,49 +1789,32 @@ async def restore_streak(access_payload: dict = Depends(validate_access_token)):
     if not user_id:
         raise HTTPException(status_code=400, detail="Invalid access token payload")
 
-    # Fetch user data from the database
-    from bson import ObjectId  # Ensure bson is imported
-    user_data = await user_collection.find_one({"_id": ObjectId(user_id)})
-    
+    # Restore the streak and deduct 1 lumens point in one conditional update
+    restored = await engagement_engine.restore_streak(user_id)
+    if restored:
+        streak = restored.get("streak", 0)
+        return {
+            "success": True,
+            "message": f"Your streak has been restored to {streak}. 1 lumens point has been deducted.",
+            "streak": streak,
+            "remaining_lumens": restored["lumens"]
+        }
+
+    # The streak was not restored, find out why
+    user_data = await user_collection.find_one({"_id": ObjectId(user_id)}, {"lumens": 1, "last_streak_update": 1})
     if not user_data:
         raise HTTPException(status_code=404, detail="User not found")
 
-    # Extract streak, lumens, and last_streak_update details
-    streak = user_data.get("streak", 0)
-    lumens = user_data.get("lumens", 1)
     last_streak_update = user_data.get("last_streak_update", None)
-
-    current_time = datetime.utcnow()
-
     if not last_streak_update:
         raise HTTPException(status_code=400, detail="No previous streak data available to restore.")
 
     # Calculate time difference since the last streak update
-    time_diff = current_time - last_streak_update
+    time_diff = datetime.utcnow() - last_streak_update
     if time_diff.total_seconds() <= 86400:
         raise HTTPException(status_code=400, detail="Your streak has not been reset; no restoration needed.")
 
-    if lumens <= 0:
-        raise HTTPException(status_code=400, detail="Not enough lumens points to restore streak.")
-
-    # Restore the streak and deduct 1 lumens point
-    await user_collection.update_one(
-        {"_id": ObjectId(user_id)},
-        {
-            "$set": {
-                "last_streak_update": current_time  # Reset the streak update time
-            },
-            "$inc": {
-                "lumens": -1  # Deduct 1 lumens point
-            }
-        }
-    )
-    return {
-        "success": True,
-        "message": f"Your streak has been restored to {streak}. 1 lumens point has been deducted.",
-        "streak": streak,
-        "remaining_lumens": lumens - 1
-    }
+    raise HTTPException(status_code=400, detail="Not enough lumens points to restore streak.")
 
 @app.post("/community/create", dependencies=[Depends(validate_access_token)])
 async def create_community(
@@ -2166,7 +2013,7 @@ async def create_role(role_data: RoleCreateSchema, access_payload: dict = Depend
         raise HTTPException(status_code=400, detail="Role with this name already exists in the community")
 
     # Check for profanity in the role name
-    if profanity.contains_profanity(role_data.role_name):
+    if moderation.contains_profanity(role_data.role_name):
         raise HTTPException(status_code=400, detail="Role name contains inappropriate or foul language")
 
     # Add the new role to the community
@@ -2249,7 +2096,7 @@ async def edit_role(role_data: RoleEditSchema, access_payload: dict = Depends(va
         )
 
     # Check for profanity in the new role name
-    if role_data.new_role_name and profanity.contains_profanity(role_data.new_role_name):
+    if role_data.new_role_name and moderation.contains_profanity(role_data.new_role_name):
         raise HTTPException(status_code=400, detail="Role name contains inappropriate or foul language")
 
     # Prepare the updated role
@@ -2765,6 +2612,56 @@ async def clear_report(reportschema: ReportClearSchema, access_payload: dict = D
 
     return {"success": True, "message": "Report has been cleared successfully."}
 
+@app.post("/team/report/confirm", dependencies=[Depends(validate_access_token)])
+async def confirm_spam_report(reportschema: ReportClearSchema, access_payload: dict = Depends(validate_access_token)):
+    # Extract the report_id from the input schema
+    if not reportschema.report_id:
+        raise HTTPException(status_code=400, detail="Report ID is required.")
+
+    # Get the user's handle based on their user_id
+    user_id = access_payload.get("user_id")
+    user = await user_collection.find_one({"_id": ObjectId(user_id)})
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    # Check if the user's handle is authorized
+    if user["handle"] not in TEAM_MEMBERS_HANDLES:
+        raise HTTPException(status_code=403, detail="You are not authorized to access this endpoint.")
+
+    report = await reports_collection.find_one({"_id": ObjectId(reportschema.report_id)})
+    if not report:
+        raise HTTPException(status_code=404, detail="Report not found.")
+
+    # Snapshot the reported text, so the example outlives the report and the post or comment
+    if report.get("post_id"):
+        target_id = report["post_id"]
+        post = await posts_collection.find_one({"post_id": target_id}, {"heading": 1, "description": 1, "tldr": 1})
+        if not post:
+            raise HTTPException(status_code=404, detail="Post not found")
+        text = f"{post.get('heading', '')} {post.get('description') or post.get('tldr') or ''}"
+    elif report.get("comment_id"):
+        target_id = report["comment_id"]
+        comment = await comments_collection.find_one({"comment_id": target_id}, {"text": 1})
+        text = comment["text"] if comment else report.get("comment_text", "")
+    else:
+        raise HTTPException(status_code=400, detail="Only post and comment reports can be confirmed as spam.")
+
+    # One example per post or comment, however many times it was reported or confirmed
+    await spam_examples_collection.update_one(
+        {"target_id": target_id},
+        {"$setOnInsert": {
+            "target_id": target_id,
+            "text": text,
+            "report_id": report.get("report_id"),
+            "confirmed_by": user_id,
+            "created_on": datetime.utcnow(),
+        }},
+        upsert=True
+    )
+    await reports_collection.update_one({"_id": report["_id"]}, {"$set": {"confirmed": True}})
+
+    return {"success": True, "message": "Report has been confirmed as spam."}
+
 @app.post("/team/user/warn", dependencies=[Depends(validate_access_token)])
 async def warn_user(user_input: FollowUnfollowSchema, user_id: str = Depends(validate_access_token)):
     """Warn a user for violating terms and conditions"""
@@ -2839,6 +2736,7 @@ async def ban_user(user_input: FollowUnfollowSchema, user_id: str = Depends(vali
     
     # Delete the banned user's account
     await user_collection.delete_one({"_id": user_input.user_id})
+    author_profiles.invalidate(str(user_input.user_id))
     
     # Send a ban email to the user
     await send_ban_email(email=email, username=username)
@@ -2872,7 +2770,7 @@ async def add_team_role(role_data: RoleGiveSchema, access_payload: dict = Depend
         raise HTTPException(status_code=400, detail="Role with this name already exists for the user")
 
     # Check for profanity in the role name
-    if profanity.contains_profanity(role_data.role_name):
+    if moderation.contains_profanity(role_data.role_name):
         raise HTTPException(status_code=400, detail="Role name contains inappropriate or foul language")
 
     # Add the new role to the target user's roles list
@@ -2933,6 +2831,32 @@ async def remove_team_role(role_data: RoleGiveSchema, access_payload: dict = Dep
         "message": f"Role '{role_data.role_name}' removed successfully from user '{target_user.get('username', 'Unknown')}'",
     }
 
+@app.post("/team/metrics/get", dependencies=[Depends(validate_access_token)])
+async def get_metrics(access_payload: dict = Depends(validate_access_token)):
+    # Get the user's handle based on their user_id
+    user_id = access_payload.get("user_id")
+    user = await user_collection.find_one({"_id": ObjectId(user_id)}, {"handle": 1})
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    # Check if the user's handle is authorized
+    if user["handle"] not in TEAM_MEMBERS_HANDLES:
+        raise HTTPException(status_code=403, detail="You are not authorized to access this endpoint.")
+
+    return {
+        "success": True,
+        "metrics": {
+            "recommendation_sources": get_source_metrics(),
+            "view_counter": view_counter.get_metrics(),
+            "author_profile_cache": author_profiles.get_metrics(),
+            "engagement_engine": engagement_engine.get_metrics(),
+            "read_history": read_history.get_metrics(),
+            "enrichment_queue": enrichment_queue.get_metrics(),
+            "llm": llm_client.get_metrics(),
+            "generation_cache": generation_cache.get_metrics(),
+            "generation": generation_stats.get_metrics(),
+        }
+    }
 
 @app.post("/algorithm/recommend/posts", dependencies=[Depends(validate_access_token)])
 async def recommend_posts(data: AlgorithmRecommendPostsSchema, access_payload: dict = Depends(validate_access_token)):
@@ -2940,13 +2864,33 @@ async def recommend_posts(data: AlgorithmRecommendPostsSchema, access_payload: d
     if not user_id:
         raise HTTPException(status_code=403, detail="Invalid access token payload")
 
-    # Call the recommendation function for posts
-    recommendations = await recommend_content(user_id=user_id, max_posts=data.posts)
+    if data.posts <= 0:
+        raise HTTPException(status_code=400, detail="Number of posts must be greater than 0")
+
+    # Following pages are served from the ranking snapshot taken for the first page
+    if data.cursor:
+        try:
+            page = await next_page(user_id, data.cursor, data.posts)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        if page is None:
+            raise HTTPException(status_code=404, detail="Cursor expired, request the first page again")
+        recommended_posts, next_cursor = page
+        return {"recommended_posts": recommended_posts, "next_cursor": next_cursor}
+
+    # Read a pre-ranked slice of the user's materialized feed
+    ranked_posts = await read_feed(user_id, FEED_SIZE)
+    if ranked_posts is None:
+        # Cold user: rank on the fly and materialize the feed for the next request
+        feed_materializer.schedule_build(user_id)
+        recommendations = await recommend_content(user_id=user_id, max_posts=FEED_SIZE)
     
-    if "recommended_posts" not in recommendations:
-        raise HTTPException(status_code=404, detail="No recommended posts found")
+        if "recommended_posts" not in recommendations:
+            raise HTTPException(status_code=404, detail="No recommended posts found")
+        ranked_posts = recommendations["recommended_posts"]
 
-    return {"recommended_posts": recommendations["recommended_posts"]}
+    recommended_posts, next_cursor = await first_page(user_id, ranked_posts, data.posts)
+    return {"recommended_posts": recommended_posts, "next_cursor": next_cursor}
 
 # Endpoint for recommending communities
 @app.post("/algorithm/recommend/communities", dependencies=[Depends(validate_access_token)])
@@ -2990,7 +2934,7 @@ async def spark_chat(request: ChatRequestSchema, access_payload: str = Depends(v
     if not user_id:
         raise HTTPException(status_code=403, detail="Invalid access token payload")
     # Check for profanity in the question
-    if profanity.contains_profanity(request.question):
+    if moderation.contains_profanity(request.question):
         raise HTTPException(status_code=400, detail="Profanity detected in the question.")
     # Proceed to get the answer from Spark
     try:
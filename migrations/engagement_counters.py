@@ -0,0 +1,167 @@
+import asyncio
+from datetime import datetime
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+from handlers.config import posts_collection, post_reactions_collection, comments_collection, comment_reactions_collection
+from handlers.models import create_indexes
+
+BATCH_SIZE = 500  # Number of posts migrated per bulk write
+
+
+async def migrate_post_reactions():
+    """
+    Moves the embedded like/dislike user lists of every post into post_reactions_collection
+    and recounts the counters from the moved reactions.
+
+    Returns:
+        int: Number of posts migrated.
+    """
+    migrated = 0
+    query = {"$or": [{"likes.users": {"$exists": True}}, {"dislikes.users": {"$exists": True}}]}
+    cursor = posts_collection.find(query, {"post_id": 1, "likes.users": 1, "dislikes.users": 1})
+
+    reactions = []
+    reaction_posts = []
+    post_updates = []
+    async for post in cursor:
+        now = datetime.utcnow()
+        liked_by = set(post.get("likes", {}).get("users", []))
+        disliked_by = set(post.get("dislikes", {}).get("users", [])) - liked_by  # A like wins over a stale dislike
+
+        for reaction_type, users in (("like", liked_by), ("dislike", disliked_by)):
+            for user_id in users:
+                reactions.append(UpdateOne(
+                    {"post_id": post["post_id"], "user_id": user_id},
+                    {"$setOnInsert": {"type": reaction_type, "created_on": now}},
+                    upsert=True
+                ))
+                reaction_posts.append(post["_id"])
+
+        post_updates.append((post["_id"], UpdateOne(
+            {"_id": post["_id"]},
+            {
+                "$set": {"likes.count": len(liked_by), "dislikes.count": len(disliked_by)},
+                "$unset": {"likes.users": "", "dislikes.users": ""}
+            }
+        )))
+
+        if len(post_updates) >= BATCH_SIZE:
+            migrated += await flush(reactions, reaction_posts, post_updates)
+            reactions, reaction_posts, post_updates = [], [], []
+
+    migrated += await flush(reactions, reaction_posts, post_updates)
+    return migrated
+
+
+async def flush(reactions, reaction_posts, post_updates):
+    """
+    Writes the reactions of a batch of posts before their embedded lists are removed.
+
+    The embedded lists of a post are kept when one of its reactions could not be written,
+    so the post is migrated again on the next run.
+
+    Args:
+        reactions (list): The reaction upserts of the batch.
+        reaction_posts (list): The _id of the post of every reaction upsert.
+        post_updates (list): The (post _id, counter update) pairs of the batch.
+
+    Returns:
+        int: Number of posts migrated.
+    """
+    failed_posts = set()
+    if reactions:
+        try:
+            await post_reactions_collection.bulk_write(reactions, ordered=False)
+        except BulkWriteError as e:
+            if e.details.get("writeConcernErrors"):
+                raise
+            for error in e.details.get("writeErrors", []):
+                # Two concurrent upserts of the same reaction, the reaction exists either way
+                if error.get("code") == 11000:
+                    continue
+                failed_posts.add(reaction_posts[error["index"]])
+                print(f"Error writing reaction {error.get('op')}: {error.get('errmsg')}")
+
+    updates = [update for post_id, update in post_updates if post_id not in failed_posts]
+    if failed_posts:
+        print(f"Kept the embedded reactions of {len(failed_posts)} posts, run the migration again to retry them")
+    if updates:
+        await posts_collection.bulk_write(updates, ordered=False)
+    return len(updates)
+
+
+async def migrate_comment_counts():
+    """
+    Stores the number of embedded comments of every post in its comment_count field.
+
+    Returns:
+        int: Number of posts updated.
+    """
+    result = await posts_collection.update_many(
+        {"comment_count": {"$exists": False}},
+        [{"$set": {"comment_count": {"$size": {"$ifNull": ["$comments", []]}}}}]
+    )
+    return result.modified_count
+
+
+async def migrate_comments():
+    """
+    Moves the embedded comments of every post into comments_collection (and their
+    like/dislike user lists into comment_reactions_collection), then removes them from the post.
+
+    Returns:
+        int: Number of comments migrated.
+    """
+    migrated = 0
+    async for post in posts_collection.find({"comments": {"$exists": True}}, {"post_id": 1, "comments": 1}):
+        comments = []
+        reactions = []
+        for comment in post.get("comments", []):
+            liked_by = set(comment.get("likes", {}).get("users", []))
+            disliked_by = set(comment.get("dislikes", {}).get("users", [])) - liked_by
+            for reaction_type, users in (("like", liked_by), ("dislike", disliked_by)):
+                for user_id in users:
+                    reactions.append(UpdateOne(
+                        {"comment_id": comment["comment_id"], "user_id": user_id},
+                        {"$setOnInsert": {"type": reaction_type, "created_on": comment["created_on"]}},
+                        upsert=True
+                    ))
+
+            comments.append(UpdateOne(
+                {"comment_id": comment["comment_id"]},
+                {"$setOnInsert": {
+                    "comment_id": comment["comment_id"],
+                    "post_id": post["post_id"],
+                    "user_id": comment["user_id"],
+                    "username": comment.get("username", "Unknown"),
+                    "pfp": comment.get("pfp", None),
+                    "text": comment["text"],
+                    "likes": {"count": len(liked_by)},
+                    "dislikes": {"count": len(disliked_by)},
+                    "created_on": comment["created_on"],
+                }},
+                upsert=True
+            ))
+
+        if comments:
+            await comments_collection.bulk_write(comments, ordered=False)
+        if reactions:
+            await comment_reactions_collection.bulk_write(reactions, ordered=False)
+        await posts_collection.update_one(
+            {"_id": post["_id"]},
+            {"$set": {"comment_count": len(comments)}, "$unset": {"comments": ""}}
+        )
+        migrated += len(comments)
+    return migrated
+
+
+async def main():
+    await create_indexes()
+    print(f"Migrated the reactions of {await migrate_post_reactions()} posts")
+    print(f"Stored the comment count of {await migrate_comment_counts()} posts")
+    print(f"Moved {await migrate_comments()} comments out of their posts")
+
+
+# Run with `python -m migrations.engagement_counters`
+if __name__ == "__main__":
+    asyncio.run(main())
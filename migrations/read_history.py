@@ -0,0 +1,49 @@
+import asyncio
+from datetime import datetime
+from pymongo import UpdateOne
+from handlers.config import read_posts_collection, read_history_collection
+from handlers.models import create_indexes
+
+BATCH_SIZE = 1000  # Number of read history entries written per bulk write
+
+
+async def migrate_read_posts():
+    """
+    Converts the read posts map of every user into per-(user, post) read history entries.
+
+    The old map has no read times, so the entries are dated (read and first read) at
+    migration time and expire with the regular read history TTL.
+
+    Returns:
+        int: Number of read history entries written.
+    """
+    migrated = 0
+    now = datetime.utcnow()
+    entries = []
+    async for read_posts in read_posts_collection.find({}, {"user_id": 1, "posts": 1}):
+        for post_id in read_posts.get("posts", {}):
+            entries.append(UpdateOne(
+                {"user_id": read_posts["user_id"], "post_id": post_id},
+                {"$setOnInsert": {"read_on": now, "first_read_on": now}},
+                upsert=True
+            ))
+            if len(entries) >= BATCH_SIZE:
+                await read_history_collection.bulk_write(entries, ordered=False)
+                migrated += len(entries)
+                entries = []
+
+    if entries:
+        await read_history_collection.bulk_write(entries, ordered=False)
+        migrated += len(entries)
+    return migrated
+
+
+async def main():
+    await create_indexes()
+    print(f"Wrote {await migrate_read_posts()} read history entries")
+    print(f"The {read_posts_collection.name} collection is no longer used and can be dropped")
+
+
+# Run with `python -m migrations.read_history`
+if __name__ == "__main__":
+    asyncio.run(main())
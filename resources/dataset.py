@@ -1,98 +1,227 @@
-import pandas as pd
+"""
+Trains the Naive Bayes spam model offline and saves it as a compact artifact.
+
+Usage:
+    python -m resources.dataset [--output resources/spam_model.npz]
+    python -m resources.dataset --reports           # SMS corpus plus the reports confirmed as spam
+    python -m resources.dataset --update --reports  # only adds the reports confirmed since the last training
+
+--update only ever adds counts: to drop a confirmed example from the model, delete it
+from the spam_examples collection and retrain without --update.
+
+The API workers only load the artifact (see `generators.spam_model`), so retrain and
+commit it whenever the dataset or the tokenizer changes.
+"""
+import argparse
+import asyncio
 import os
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from generators.spam_model import MODEL_FILE, MODEL_VERSION, SpamModel, tokenize
 
 DATASET_FILE = os.path.join("resources", "SpamCollection")
-print("Loading Spam detection model...")
-sms_spam = pd.read_csv(DATASET_FILE, sep='\t',
-header=None, names=['Label', 'SMS'])
-sms_spam.head()
-sms_spam['Label'].value_counts(normalize=True)
-
-# Randomize the dataset
-data_randomized = sms_spam.sample(frac=1, random_state=1)
-
-# Calculate index for split
-training_test_index = round(len(data_randomized) * 0.8)
-
-# Split into training and test sets
-training_set = data_randomized[:training_test_index].reset_index(drop=True)
-test_set = data_randomized[training_test_index:].reset_index(drop=True)
-training_set['Label'].value_counts(normalize=True)
-
-test_set['Label'].value_counts(normalize=True)
-
-training_set.head(3)
-
-training_set['SMS'] = training_set['SMS'].str.replace('\W', ' ') # Removes punctuation
-training_set['SMS'] = training_set['SMS'].str.lower()
-training_set.head(3)
-
-training_set['SMS'] = training_set['SMS'].str.split()
-vocabulary = []
-for sms in training_set['SMS']:
-   for word in sms:
-      vocabulary.append(word)
-
-vocabulary = list(set(vocabulary))
-
-word_counts_per_sms = {'secret': [2,1,1],
-                       'prize': [2,0,1],
-                       'claim': [1,0,1],
-                       'now': [1,0,1],
-                       'coming': [0,1,0],
-                       'to': [0,1,0],
-                       'my': [0,1,0],
-                       'party': [0,1,0],
-                       'winner': [0,0,1]
-                      }
-
-word_counts = pd.DataFrame(word_counts_per_sms)
-word_counts.head()
-
-word_counts_per_sms = {unique_word: [0] * len(training_set['SMS']) for unique_word in vocabulary}
-
-for index, sms in enumerate(training_set['SMS']):
-   for word in sms:
-      word_counts_per_sms[word][index] += 1
-
-word_counts = pd.DataFrame(word_counts_per_sms)
-word_counts.head()
-
-training_set_clean = pd.concat([training_set, word_counts], axis=1)
-training_set_clean.head()
-
-# Isolating spam and ham messages first
-spam_messages = training_set_clean[training_set_clean['Label'] == 'spam']
-ham_messages = training_set_clean[training_set_clean['Label'] == 'ham']
-
-# P(Spam) and P(Ham)
-p_spam = len(spam_messages) / len(training_set_clean)
-p_ham = len(ham_messages) / len(training_set_clean)
-
-# N_Spam
-n_words_per_spam_message = spam_messages['SMS'].apply(len)
-n_spam = n_words_per_spam_message.sum()
-
-# N_Ham
-n_words_per_ham_message = ham_messages['SMS'].apply(len)
-n_ham = n_words_per_ham_message.sum()
-
-# N_Vocabulary
-n_vocabulary = len(vocabulary)
-
-# Laplace smoothing
-alpha = 1
-
-# Initiate parameters
-parameters_spam = {unique_word:0 for unique_word in vocabulary}
-parameters_ham = {unique_word:0 for unique_word in vocabulary}
-
-# Calculate parameters
-for word in vocabulary:
-   n_word_given_spam = spam_messages[word].sum() # spam_messages already defined
-   p_word_given_spam = (n_word_given_spam + alpha) / (n_spam + alpha*n_vocabulary)
-   parameters_spam[word] = p_word_given_spam
-
-   n_word_given_ham = ham_messages[word].sum() # ham_messages already defined
-   p_word_given_ham = (n_word_given_ham + alpha) / (n_ham + alpha*n_vocabulary)
-   parameters_ham[word] = p_word_given_ham
\ No newline at end of file
+ALPHA = 1  # Laplace smoothing
+LABELS = ("spam", "ham")
+REPORT_BATCH_SIZE = 500  # Number of confirmed spam examples per partial fit
+
+
+def load_dataset(path=DATASET_FILE):
+    """
+    Loads the labelled SMS dataset and splits it into training and test sets.
+
+    Args:
+        path (str): Path of the tab separated (label, message) dataset.
+
+    Returns:
+        tuple: The randomized 80% training set and 20% test set.
+    """
+    sms_spam = pd.read_csv(path, sep='\t', header=None, names=['Label', 'SMS'])
+
+    # Randomize the dataset
+    data_randomized = sms_spam.sample(frac=1, random_state=1)
+
+    # Calculate index for split
+    training_test_index = round(len(data_randomized) * 0.8)
+
+    # Split into training and test sets
+    training_set = data_randomized[:training_test_index].reset_index(drop=True)
+    test_set = data_randomized[training_test_index:].reset_index(drop=True)
+    return training_set, test_set
+
+
+class SpamTrainer:
+    """
+    Incremental Naive Bayes trainer on sparse word counts.
+
+    Every `partial_fit` tokenizes a batch of labelled messages into (message, word)
+    occurrences and adds them to the per-class word count vectors with a sparse
+    bincount, growing the vocabulary as new words appear. No (message x vocabulary)
+    table is ever built, and the counts are saved in the artifact so that training
+    can resume from it later.
+    """
+
+    def __init__(self, vocabulary=(), word_counts=None, message_counts=None, reports_until=None):
+        self.vocabulary = list(vocabulary)
+        self.index = {word: index for index, word in enumerate(self.vocabulary)}
+        self.word_counts = word_counts or {label: np.zeros(len(self.vocabulary), dtype=np.int64) for label in LABELS}
+        self.message_counts = message_counts or {label: 0 for label in LABELS}
+        self.reports_until = reports_until
+
+    @classmethod
+    def from_artifact(cls, path=MODEL_FILE):
+        """Resumes training from the counts of a saved artifact."""
+        with np.load(path) as artifact:
+            if int(artifact["version"]) != MODEL_VERSION:
+                raise ValueError(f"Spam model artifact {path} is outdated, retrain it from scratch")
+            reports_until = str(artifact["reports_until"])
+            return cls(
+                artifact["vocabulary"].tolist(),
+                {label: artifact[f"{label}_counts"].astype(np.int64) for label in LABELS},
+                {label: int(artifact[f"{label}_messages"]) for label in LABELS},
+                datetime.fromisoformat(reports_until) if reports_until else None
+            )
+
+    def partial_fit(self, labels, messages):
+        """
+        Adds a batch of labelled messages to the counts.
+
+        Args:
+            labels (list): The label ("spam" or "ham") of every message.
+            messages (list): The texts of the messages.
+        """
+        rows, columns = [], []
+        for row, message in enumerate(messages):
+            for word in tokenize(message):
+                column = self.index.get(word)
+                if column is None:
+                    column = self.index[word] = len(self.vocabulary)
+                    self.vocabulary.append(word)
+                rows.append(row)
+                columns.append(column)
+
+        labels = np.asarray(labels)
+        row_labels = labels[np.asarray(rows, dtype=np.int64)]
+        columns = np.asarray(columns, dtype=np.int64)
+        for label in LABELS:
+            counts = np.bincount(columns[row_labels == label], minlength=len(self.vocabulary))
+            counts[:len(self.word_counts[label])] += self.word_counts[label]
+            self.word_counts[label] = counts
+            self.message_counts[label] += int(np.count_nonzero(labels == label))
+
+    def parameters(self, alpha=ALPHA):
+        """
+        Computes the artifact of the model: the counts, and the Naive Bayes parameters in log space.
+
+        Args:
+            alpha (float): Laplace smoothing.
+
+        Returns:
+            dict: The arrays of the artifact.
+        """
+        n_vocabulary = len(self.vocabulary)
+        n_messages = sum(self.message_counts.values())
+        parameters = {
+            "vocabulary": np.array(self.vocabulary),
+            "reports_until": self.reports_until.isoformat() if self.reports_until else "",
+        }
+        for label in LABELS:
+            counts = self.word_counts[label]
+            parameters[f"{label}_counts"] = counts
+            parameters[f"{label}_messages"] = self.message_counts[label]
+            # P(word | label) with Laplace smoothing
+            parameters[f"log_{label}"] = np.log((counts + alpha) / (counts.sum() + alpha * n_vocabulary))
+            parameters[f"log_prior_{label}"] = np.log(self.message_counts[label] / n_messages)
+        return parameters
+
+    def model(self):
+        """Returns a classifier of the current counts."""
+        parameters = self.parameters()
+        return SpamModel(
+            parameters["vocabulary"], parameters["log_spam"], parameters["log_ham"],
+            parameters["log_prior_spam"], parameters["log_prior_ham"]
+        )
+
+
+async def stream_confirmed_spam(since=None, batch_size=REPORT_BATCH_SIZE):
+    """
+    Streams the texts of the reported posts and comments a team member confirmed as spam, in batches.
+
+    Unreviewed reports are never used: a report only becomes a spam example once it is
+    confirmed with `/team/report/confirm`, which stores one example per post or comment
+    no matter how many times it was reported.
+
+    Args:
+        since (datetime): Only examples confirmed after this time are streamed.
+        batch_size (int): Number of examples per batch.
+
+    Yields:
+        tuple: The texts of a batch, and the confirmation time of its last example.
+    """
+    # Only needed with --reports, so the SMS training works without the API configuration
+    from handlers.config import spam_examples_collection
+
+    query = {"created_on": {"$gt": since}} if since else {}
+    cursor = spam_examples_collection.find(query, {"text": 1, "created_on": 1}).sort("created_on", 1).batch_size(batch_size)
+
+    batch = []
+    async for example in cursor:
+        batch.append(example)
+        if len(batch) >= batch_size:
+            yield [example["text"] for example in batch], batch[-1]["created_on"]
+            batch = []
+    if batch:
+        yield [example["text"] for example in batch], batch[-1]["created_on"]
+
+
+async def fit_reports(trainer):
+    """
+    Adds the spam examples confirmed since the last training to a trainer.
+
+    Counts can only be added: an example removed from spam_examples_collection after it
+    was trained on stays in the artifact until the model is retrained without --update.
+
+    Returns:
+        int: Number of messages added.
+    """
+    added = 0
+    async for texts, last_confirmed_on in stream_confirmed_spam(trainer.reports_until):
+        trainer.partial_fit(["spam"] * len(texts), texts)
+        trainer.reports_until = last_confirmed_on
+        added += len(texts)
+    return added
+
+
+def save_model(parameters, path=MODEL_FILE):
+    """Saves the model parameters as a versioned artifact."""
+    np.savez_compressed(path, version=MODEL_VERSION, **parameters)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the spam model and save it as an artifact.")
+    parser.add_argument("--dataset", default=DATASET_FILE, help="labelled SMS dataset")
+    parser.add_argument("--output", default=MODEL_FILE, help="path of the model artifact")
+    parser.add_argument("--reports", action="store_true", help="also train on the reported posts and comments confirmed as spam")
+    parser.add_argument("--update", action="store_true", help="resume from the counts of the existing artifact")
+    args = parser.parse_args()
+
+    training_set, test_set = load_dataset(args.dataset)
+    if args.update:
+        trainer = SpamTrainer.from_artifact(args.output)
+    else:
+        trainer = SpamTrainer()
+        trainer.partial_fit(training_set['Label'].tolist(), training_set['SMS'].tolist())
+
+    if args.reports:
+        print(f"Added {asyncio.run(fit_reports(trainer))} reported messages")
+
+    save_model(trainer.parameters(), args.output)
+
+    # Held-out accuracy on the 20% SMS test split
+    predictions = trainer.model().classify_batch(test_set['SMS'].tolist())
+    accuracy = np.mean([prediction == (label == "spam") for prediction, label in zip(predictions, test_set['Label'])])
+    print(f"Saved the spam model ({len(trainer.vocabulary)} words) to {args.output}, test accuracy {accuracy:.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+import asyncio
+import pytest
+
+pytest.importorskip("ollama")
+
+from generators.llm_client import LLMClient
+
+
+class StubAsyncClient:
+    """Stands in for `ollama.AsyncClient`, answering after a delay and recording the calls in flight."""
+
+    def __init__(self, delay=0.01, chunks=("Hello", " ", "world"), chunk_delay=0.0):
+        self.delay = delay
+        self.chunks = chunks
+        self.chunk_delay = chunk_delay
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.cancelled = 0
+        self.streams_closed = 0
+
+    async def generate(self, model, prompt, stream=False, **kwargs):
+        if stream:
+            return self._stream()
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        finally:
+            self.in_flight -= 1
+        return {"response": f"{model}: {prompt}"}
+
+    async def _stream(self):
+        try:
+            for chunk in self.chunks:
+                await asyncio.sleep(self.chunk_delay)
+                yield {"response": chunk}
+        finally:
+            self.streams_closed += 1
+
+
+def make_client(stub, max_concurrency=2, timeout=1.0):
+    client = LLMClient(model="stub", max_concurrency=max_concurrency, timeout=timeout)
+    client.client = stub
+    return client
+
+
+async def collect(client, prompt, **kwargs):
+    return [chunk async for chunk in client.stream(prompt, **kwargs)]
+
+
+def test_generate_returns_the_response():
+    client = make_client(StubAsyncClient())
+    assert asyncio.run(client.generate("hi")) == "stub: hi"
+    assert client.get_metrics() == {"model": "stub", "calls": 1, "timeouts": 0}
+
+
+def test_semaphore_caps_generations_in_flight():
+    stub = StubAsyncClient(delay=0.02)
+    client = make_client(stub, max_concurrency=2)
+
+    async def burst():
+        return await asyncio.gather(*(client.generate(str(number)) for number in range(8)))
+
+    assert asyncio.run(burst()) == [f"stub: {number}" for number in range(8)]
+    assert stub.max_in_flight == 2
+    assert client.calls == 8
+
+
+def test_timeout_cancels_the_request_and_is_counted():
+    stub = StubAsyncClient(delay=1.0)
+    client = make_client(stub, timeout=0.01)
+
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(client.generate("slow"))
+    assert stub.cancelled == 1
+    assert stub.in_flight == 0
+    assert client.timeouts == 1
+
+
+def test_cancelling_the_caller_aborts_the_request_and_frees_the_slot():
+    stub = StubAsyncClient(delay=1.0)
+    client = make_client(stub, max_concurrency=1)
+
+    async def cancel_then_generate():
+        task = asyncio.create_task(client.generate("slow"))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        stub.delay = 0.0
+        return await client.generate("next")
+
+    assert asyncio.run(cancel_then_generate()) == "stub: next"
+    assert stub.cancelled == 1
+    assert client.timeouts == 0
+
+
+def test_stream_yields_the_chunks_in_order():
+    stub = StubAsyncClient()
+    client = make_client(stub)
+
+    assert asyncio.run(collect(client, "hi")) == ["Hello", " ", "world"]
+    assert stub.streams_closed == 1
+
+
+def test_stream_closes_the_response_when_the_consumer_stops_early():
+    stub = StubAsyncClient(chunks=("a", "b", "c", "d"))
+    client = make_client(stub, max_concurrency=1)
+
+    async def first_chunk():
+        stream = client.stream("hi")
+        async for chunk in stream:
+            await stream.aclose()
+            return chunk
+
+    assert asyncio.run(first_chunk()) == "a"
+    assert stub.streams_closed == 1
+    # The slot was released, so a following generation does not wait
+    assert asyncio.run(client.generate("next")) == "stub: next"
+
+
+def test_stream_times_out_over_the_whole_generation():
+    stub = StubAsyncClient(chunks=("a", "b", "c", "d"), chunk_delay=0.03)
+    client = make_client(stub)
+
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(collect(client, "hi", timeout=0.05))
+    assert stub.streams_closed == 1
+    assert client.timeouts == 1
@@ -0,0 +1,57 @@
+import random
+from datetime import datetime, timedelta
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from handlers.config import all_subcategories
+from algorithm.recommendation import calculate_post_score
+from algorithm.vector_ranking import TAG_IDS, score_posts_vectorized, rank_posts_vectorized
+
+
+def make_post(tags, now, rng):
+    return {
+        "post_id": str(rng.random()),
+        "tags": tags,
+        "likes": {"count": rng.randint(0, 100)},
+        "dislikes": {"count": rng.randint(0, 30)},
+        "comment_count": rng.randint(0, 20),
+        "views": rng.randint(0, 500),
+        "created_on": now - timedelta(days=rng.randint(0, 20)),
+    }
+
+
+def test_tag_ids_are_contiguous():
+    assert sorted(TAG_IDS.values()) == list(range(len(set(all_subcategories))))
+
+
+def test_scores_match_calculate_post_score_on_real_tags():
+    rng = random.Random(0)
+    now = datetime.utcnow()
+    tags = list(dict.fromkeys(all_subcategories))
+    posts = [make_post(rng.sample(tags, 5), now, rng) for _ in range(300)]
+    # Every tag of tags.json, including the ones listed last, and tags missing from it
+    posts += [make_post([tag], now, rng) for tag in tags]
+    posts += [make_post(["#ruby", "#not-a-tag"], now, rng), make_post([], now, rng)]
+
+    for user_interests in (rng.sample(tags, 10), ["#custom"], ["#custom", "#ruby", tags[-1]], []):
+        expected = [calculate_post_score(post, user_interests, now) for post in posts]
+        assert score_posts_vectorized(posts, user_interests, now).tolist() == expected
+
+
+def test_interest_outside_tags_does_not_match_known_tags():
+    now = datetime.utcnow()
+    post = make_post(["#ruby"], now, random.Random(1))
+    assert score_posts_vectorized([post], ["#custom"], now).tolist() == [calculate_post_score(post, ["#custom"], now)]
+
+
+def test_rank_keeps_the_best_posts():
+    rng = random.Random(2)
+    now = datetime.utcnow()
+    tags = list(dict.fromkeys(all_subcategories))
+    posts = [make_post(rng.sample(tags, 5), now, rng) for _ in range(200)]
+    user_interests = rng.sample(tags, 20)
+
+    ranked = rank_posts_vectorized(posts, user_interests, now, limit=10)
+    expected = sorted((calculate_post_score(post, user_interests, now) for post in posts), reverse=True)[:10]
+    assert [score for score, _ in ranked] == expected